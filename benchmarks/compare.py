@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+# vim: ts=4 number et
+"""
+    compares two benchmarks/run.py results and flags regressions
+
+        python benchmarks/compare.py before.json after.json [--threshold 10]
+
+    exits with status 1 when any case common to both files lost more than `threshold` percent of throughput or
+    grew its peak memory by more than `threshold` percent
+"""
+from argparse import ArgumentParser
+import json
+import sys
+
+
+def compare(before, after, threshold):
+    """ yields (name, throughput ratio, memory ratio, regressed) for cases present in both results """
+    for name in sorted(set(before) & set(after)):
+        b, a = before[name], after[name]
+        speed = a['seconds'] and b['seconds'] / a['seconds']
+        memory = b['peak_memory'] and a['peak_memory'] / b['peak_memory']
+        regressed = bool(speed and speed < 1 - threshold) or bool(memory and memory > 1 + threshold)
+        yield name, speed, memory, regressed
+
+def main(argv = None):
+    parser = ArgumentParser(description = "compare two benchmark results")
+    parser.add_argument('before')
+    parser.add_argument('after')
+    parser.add_argument('-t', '--threshold', type = float, default = 10, help = "tolerance, in percent (default: 10)")
+    parser.add_argument('-a', '--all', action = 'store_true', help = "show all cases, not only regressions")
+    args = parser.parse_args(argv)
+
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    print(f"before: {before['meta']['commit']}  after: {after['meta']['commit']}")
+
+    regressions = 0
+    for name, speed, memory, regressed in compare(before['results'], after['results'], args.threshold / 100):
+        regressions += regressed
+        if regressed or args.all:
+            print(f"{'REGRESSION' if regressed else '':10} {name:70} speed ×{speed or 0:6.2f}   memory ×{memory or 0:6.2f}")
+    print(f"{regressions} regression(s)")
+    return 1 if regressions else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,47 @@
+#!/usr/bin/env python
+# vim: ts=4 number et
+"""
+    cold import time of bytes_as_braille, measured with `python -X importtime` in fresh interpreters
+
+        python benchmarks/importtime.py [--budget 25] [--runs 10]
+
+    prints the best of `runs` cumulative import times, in ms, along with the slowest modules ; exits with status 1
+    when the budget is exceeded
+"""
+from argparse import ArgumentParser
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def importtime(module):
+    """ {imported module: (self µs, cumulative µs)} for one cold import of `module` """
+    env = dict(os.environ, PYTHONPATH = os.path.join(ROOT, 'src'))
+    stderr = subprocess.run([sys.executable, '-X', 'importtime', '-c', f"import {module}"], env = env,
+        capture_output = True, text = True, check = True).stderr
+    times = {}
+    for line in stderr.splitlines():
+        if line.startswith('import time:') and '|' in line:
+            own, cumulative, name = line[len('import time:'):].split('|')
+            if own.strip().isdigit():
+                times[name.strip()] = (int(own), int(cumulative))
+    return times
+
+def main(argv = None):
+    parser = ArgumentParser(description = "bytes_as_braille cold import time")
+    parser.add_argument('-b', '--budget', type = float, default = 25, help = "milliseconds (default: 25)")
+    parser.add_argument('-n', '--runs', type = int, default = 10)
+    parser.add_argument('-m', '--module', default = 'bytes_as_braille')
+    args = parser.parse_args(argv)
+
+    best = min(( importtime(args.module) for _ in range(args.runs) ), key = lambda times: times[args.module][1])
+    for name, (own, cumulative) in sorted(best.items(), key = lambda item: -item[1][0])[:10]:
+        print(f"{own/1000:8.2f} ms {cumulative/1000:8.2f} ms  {name}")
+    total = best[args.module][1] / 1000
+    print(f"{args.module}: {total:.2f} ms (budget: {args.budget:g} ms)")
+    return 0 if total <= args.budget else 1
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,169 @@
+#!/usr/bin/env python
+# vim: ts=4 number et
+"""
+    benchmarks for bytes_as_braille, stdlib only (runs offline)
+
+    measures to_braille() over its options, from_braille() round trips, bprint() to a null sink, to_braille_batch()
+    and BrailleWriter against a call per record, and binary_clock() on text and random inputs from 16 B up to --max-size, and saves the results as JSON for compare.py:
+
+        python benchmarks/run.py -o before.json
+        …
+        python benchmarks/run.py -o after.json
+        python benchmarks/compare.py before.json after.json
+
+    colors: truecolor only enables itself when COLORTERM is set ; it is set here (unless already) so that the
+    colored paths are measured too
+"""
+from argparse import ArgumentParser
+from contextlib import redirect_stdout
+from datetime import datetime, timezone
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [os.path.join(ROOT, 'src'), ROOT]
+os.environ.setdefault('COLORTERM', 'truecolor')
+
+SIZES = [16, 256, 4 << 10, 64 << 10, 1 << 20, 16 << 20, 256 << 20, 1 << 30]
+UNITS = {'': 1, 'K': 1 << 10, 'M': 1 << 20, 'G': 1 << 30}
+RECORD_SIZE = 16       # bytes per record for the batch cases
+
+
+def parse_size(size):
+    """ '64K' → 65536 """
+    size = size.upper().rstrip('B')
+    unit = size[-1:] if size[-1:] in UNITS else ''
+    return int(size[:len(size) - len(unit)]) * UNITS[unit]
+
+def format_size(size):
+    for unit in ('G', 'M', 'K'):
+        if size >= UNITS[unit] and size % UNITS[unit] == 0:
+            return f"{size // UNITS[unit]}{unit}"
+    return str(size)
+
+def make_input(kind, size):
+    """ 'random' bytes, or utf-8 'text' (mostly ascii, some multibyte characters) """
+    if kind == 'random':
+        return os.urandom(size)
+    text = "Lorem ipsum dolor sit amet, consectetur adipiscing elit ; Braille ⠃⠗⠁⠊⠇⠇⠑, café.\n".encode('utf-8')
+    data = text * (size // len(text) + 1)
+    return data[:size].decode('utf-8', 'ignore').encode('utf-8')
+
+def cases(bab, binary_clock, sizes, kinds):
+    """ yields (name, size in bytes, function) """
+    from bytes_as_braille.writer import BrailleWriter
+    palettes = [None] + sorted(bab.PALETTES)
+
+    def write_records(records):
+        with BrailleWriter(NULL, colorblind = True) as out:
+            out.writelines(records)
+
+    for kind in kinds:
+        for size in sizes:
+            data = make_input(kind, size)
+            tag = f"{kind}-{format_size(size)}"
+
+            for byteorder in ('big', 'little'):
+                for show_ascii in (False, True):
+                    options = dict(byteorder = byteorder, show_ascii = show_ascii)
+                    flags = f"{byteorder}{'-ascii' if show_ascii else ''}"
+                    yield (f"to_braille[{tag}-{flags}-colorblind]", size,
+                        lambda data = data, options = options: bab.to_braille(data, colorblind = True, **options))
+                    yield (f"to_braille[{tag}-{flags}-colorblind-bytes]", size,
+                        lambda data = data, options = options: bab.to_braille(data, colorblind = True, as_bytes = True,
+                            **options))
+                    for rainbow in (True, False):
+                        for palette in palettes:
+                            colors = bab.PALETTES[palette] if palette else None
+                            name = f"to_braille[{tag}-{flags}-{'rainbow' if rainbow else 'plain'}-{palette}]"
+                            yield (name, size, lambda data = data, options = options, rainbow = rainbow, colors = colors:
+                                bab.to_braille(data, rainbow = rainbow, colors = colors, **options))
+
+                    encoded = bab.to_braille(data, encoding = None, colorblind = True, **options)
+                    yield (f"from_braille[{tag}-{flags}]", size,
+                        lambda encoded = encoded, byteorder = byteorder: bab.from_braille(encoded, byteorder))
+
+            # many small records (ids, hashes): one call each, or a single batch
+            records = [ data[i:i+RECORD_SIZE] for i in range(0, size, RECORD_SIZE) ]
+            yield (f"to_braille-records[{tag}]", size,
+                lambda records = records: [ bab.to_braille(r, colorblind = True) for r in records ])
+            yield (f"to_braille_batch[{tag}]", size,
+                lambda records = records: bab.to_braille_batch(records, colorblind = True))
+            yield (f"bprint-records[{tag}]", size, lambda records = records:
+                [ bab.bprint(r, colorblind = True, file = NULL) for r in records ])
+            yield (f"BrailleWriter-records[{tag}]", size, lambda records = records: write_records(records))
+
+            yield (f"bprint[{tag}]", size, lambda data = data: bab.bprint(data, file = NULL))
+    yield ("binary_clock", 19, lambda: binary_clock(colorblind = True))
+
+def measure(function, size, min_time):
+    """ best time over repeated runs, throughput and peak traced memory of one run """
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < 3 or (time.perf_counter() < deadline and len(timings) < 1000):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    function()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    best = min(timings)
+    return {
+        'size': size,
+        'runs': len(timings),
+        'seconds': best,
+        'throughput': size / best if best else None,
+        'peak_memory': peak,
+    }
+
+def metadata():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd = ROOT, capture_output = True,
+            text = True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'date': datetime.now(timezone.utc).isoformat(),
+        'commit': commit,
+        'python': sys.version,
+        'platform': platform.platform(),
+    }
+
+NULL = open(os.devnull, 'w')
+
+def main(argv = None):
+    parser = ArgumentParser(description = "bytes_as_braille benchmarks")
+    parser.add_argument('-o', '--output', default = 'bench.json', help = "JSON results (default: bench.json)")
+    parser.add_argument('-s', '--max-size', default = '1M', help = "largest input, ie. 64K, 16M, 1G (default: 1M)")
+    parser.add_argument('-k', '--filter', action = 'append', default = [], help = "only run cases containing this")
+    parser.add_argument('--kind', choices = ('text', 'random'), action = 'append', help = "input kinds (default: both)")
+    parser.add_argument('-t', '--min-time', type = float, default = 0.2, help = "seconds spent per case, at least")
+    args = parser.parse_args(argv)
+
+    with redirect_stdout(NULL):     # truecolor/termcolor detection
+        import bytes_as_braille as bab
+        from binary_clock import binary_clock
+
+    sizes = [ size for size in SIZES if size <= parse_size(args.max_size) ]
+    results = {}
+    for name, size, function in cases(bab, binary_clock, sizes, args.kind or ['text', 'random']):
+        if args.filter and not any( f in name for f in args.filter ):
+            continue
+        with redirect_stdout(NULL):
+            results[name] = measure(function, size, args.min_time)
+        result = results[name]
+        print(f"{name:70} {result['seconds']*1e6:12.1f} µs {(result['throughput'] or 0) / 1e6:10.1f} MB/s "
+            f"{result['peak_memory'] / 1e6:10.1f} MB", file = sys.stderr)
+
+    with open(args.output, 'w') as f:
+        json.dump({'meta': metadata(), 'results': results}, f, indent = 1)
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main())
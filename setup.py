@@ -31,8 +31,14 @@ setup(
         #"Topic :: Multimedia :: Graphics",
         "Topic :: Software Development :: Libraries :: Python Modules",
     ],
-    entry_points={"console_scripts": ["bytestrings = bytes_as_braille.bytes_as_braille:main"]},
+    entry_points={
+        "console_scripts": [
+            "braille-dump = bytes_as_braille.cli:dump",
+            "braille-undump = bytes_as_braille.cli:undump",
+        ]
+    },
     setup_requires=["setuptools_scm"],
     #extras_require={"images": ["pillow"]},
+    extras_require={"numpy": ["numpy"]},
     include_package_data=True,
 )
@@ -0,0 +1,49 @@
+# vim: ts=4 number et
+"""
+    color backend, detected on first use rather than at import time
+
+    truecolor is preferred ; it refuses to load outside of a true color terminal (COLORTERM), in which case
+    termcolor (or nothing) is used and bytes are not colored
+"""
+from collections import namedtuple
+from functools import lru_cache
+from sys import stderr
+
+Backend = namedtuple('Backend', ('name', 'fore_text', 'bold', 'colors'))
+Backend.__doc__ = """ fore_text(txt, color) and bold(color) functions, and the COLORS table (None if colors are unavailable) """
+
+_MESSAGES = {
+    'truecolor': "Using truecolor",
+    'termcolor': "Not a true color terminal... using 'termcolor'",
+    None: "No colors will be used",
+}
+
+
+def _plain_text(txt, color = None):
+    return txt
+
+def _plain_bold(color):
+    return color
+
+@lru_cache(maxsize = None)
+def _detect():
+    try:
+        from truecolor import fore_text, bold, COLORS
+        return Backend('truecolor', fore_text, bold, COLORS)
+    except ImportError:
+        pass
+    except RuntimeError:    # "Not a true color terminal"
+        try:
+            import termcolor
+        except ImportError:
+            pass
+        else:
+            return Backend('termcolor', lambda txt, color = None: termcolor.colored(txt), _plain_bold, None)
+    return Backend(None, _plain_text, _plain_bold, None)
+
+def color_backend(verbose = False):
+    """ the (cached) color Backend ; with verbose, also tells on stderr which one is used """
+    backend = _detect()
+    if verbose:
+        print(_MESSAGES[backend.name], file = stderr)
+    return backend
@@ -0,0 +1,159 @@
+# vim: ts=4 number et
+"""
+    command line tools:
+
+        braille-dump [FILE …]      bytes to Braille cells (or a hexyl-style view, with --view)
+        braille-undump [FILE …]    Braille cells back to bytes
+
+    files are mmap'ed when possible, standard input is read in large chunks, and output goes straight to the
+    binary stdout buffer, one large write per chunk ; with --follow, a growing file is read as it grows and output
+    flushed as it comes
+"""
+from argparse import ArgumentParser, ArgumentTypeError
+from codecs import getincrementaldecoder
+from contextlib import ExitStack
+import mmap
+import os
+import sys
+
+from bytes_as_braille import braille_encoder, iter_braille, from_braille, load_palette, PALETTES
+from bytes_as_braille.dump import iter_dump
+from bytes_as_braille.engine import BYTEORDERS, ERRORS, LAYOUTS
+from bytes_as_braille.stream import follow, iter_chunks
+
+CHUNK_SIZE = 1 << 20
+
+
+def open_input(path, stack, mapped = True):
+    """ a buffer or binary file object for `path` ('-' is standard input), closed with `stack`
+
+        mapped: mmap regular files ; off for files that may grow
+    """
+    if path == '-':
+        return sys.stdin.buffer
+    f = stack.enter_context(open(path, 'rb'))
+    if not mapped:
+        return f
+    try:
+        return stack.enter_context(mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ))
+    except (ValueError, OSError):   # empty file, pipe, …
+        return f
+
+def _run(main, argv):
+    """ runs main(argv), quietly exiting when the reading end of the pipe goes away (ie. `| head`) """
+    try:
+        return main(argv)
+    except BrokenPipeError:
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 1
+    except KeyboardInterrupt:
+        return 130
+
+def _positive(s):
+    """ argparse type: an integer of at least 1 """
+    try:
+        n = int(s)
+    except ValueError:
+        raise ArgumentTypeError(f"invalid int value: {s!r}") from None
+    if n < 1:
+        raise ArgumentTypeError(f"must be at least 1: {s!r}")
+    return n
+
+def _encode_args(parser):
+    parser.add_argument('files', nargs = '*', default = ['-'], metavar = 'FILE', help = "input files (default: stdin)")
+    parser.add_argument('-b', '--byteorder', choices = BYTEORDERS, default = 'big')
+    parser.add_argument('-l', '--layout', choices = LAYOUTS, default = 'columns', help = "which dot stands for which bit")
+    parser.add_argument('-c', '--chunk-size', type = _positive, default = CHUNK_SIZE, help = "bytes (cells, when undumping) per chunk")
+
+def dump_main(argv = None):
+    """ braille-dump entry point """
+    parser = ArgumentParser(prog = 'braille-dump', description = "display bytes as Braille cells")
+    _encode_args(parser)
+    parser.add_argument('-a', '--show-ascii', action = 'store_true', help = "show ascii-printables as-is")
+    parser.add_argument('--color', action = 'store_true', help = "color output (requires truecolor)")
+    parser.add_argument('-p', '--palette', choices = sorted(PALETTES), help = "color bytes with a palette")
+    parser.add_argument('-P', '--palette-file', help = "color bytes with a palette from a TOML or JSON file")
+    parser.add_argument('--no-rainbow', action = 'store_true', help = "only color bytes from the palette")
+    parser.add_argument('--coalesce', action = 'store_true', help = "only emit color escapes on change")
+    parser.add_argument('-v', '--view', action = 'store_true', help = "hexyl-style view, with offsets")
+    parser.add_argument('-w', '--width', type = _positive, help = "bytes per row with --view (default: fit terminal)")
+    parser.add_argument('-g', '--group', type = _positive, default = 8, help = "bytes per group with --view")
+    parser.add_argument('-s', '--side', choices = ('ascii', 'hex', 'none'), default = 'ascii',
+        help = "side column with --view")
+    parser.add_argument('-f', '--follow', action = 'store_true',
+        help = "output appended bytes as the file grows (tail -f) ; a pipe is read until it closes")
+    args = parser.parse_args(argv)
+    if args.follow and len(args.files) > 1:
+        parser.error("--follow takes a single file")
+
+    if args.palette_file:
+        colors = load_palette(args.palette_file)
+    else:
+        colors = PALETTES[args.palette] if args.palette else None
+    options = dict(
+        byteorder = args.byteorder,
+        show_ascii = args.show_ascii,
+        colorblind = not (args.color or colors is not None),
+        rainbow = not args.no_rainbow,
+        colors = colors,
+        coalesce = args.coalesce,
+        layout = args.layout,
+    )
+    out = sys.stdout.buffer
+    with ExitStack() as stack:
+        for path in args.files:
+            source = open_input(path, stack, mapped = not args.follow)
+            if args.view:
+                blocks = iter_dump(source, width = args.width, group = args.group,
+                    side = None if args.side == 'none' else args.side, follow = args.follow, **options)
+                blocks = ( block.encode('utf-8') for block in blocks )
+            elif args.follow:   # each read as it comes (little-endian: reversed on its own)
+                blocks = map(braille_encoder(encoding = None, as_bytes = True, **options),
+                    follow(source, args.chunk_size))
+            else:
+                blocks = iter_braille(source, args.chunk_size, as_bytes = True, **options)
+            for block in blocks:
+                out.write(block)
+                if args.follow:
+                    out.flush()
+    if not args.view and out.isatty():
+        out.write(b'\n')
+    out.flush()
+    return 0
+
+def undump_main(argv = None):
+    """ braille-undump entry point """
+    parser = ArgumentParser(prog = 'braille-undump', description = "convert Braille cells back to bytes")
+    _encode_args(parser)
+    parser.add_argument('-e', '--encoding', default = 'utf-8', help = "input encoding, also used for non-Braille text")
+    parser.add_argument('--errors', choices = ERRORS, default = 'passthrough',
+        help = "what to do with characters that are not Braille cells")
+    args = parser.parse_args(argv)
+
+    out = sys.stdout.buffer
+    with ExitStack() as stack:
+        for path in args.files:
+            source = open_input(path, stack)
+            # chunks of exactly chunk_size characters, which is what braille-dump reversed with --byteorder little
+            decoder = getincrementaldecoder(args.encoding)()
+            text = ''
+            for chunk in iter_chunks(source, args.chunk_size):
+                text += decoder.decode(chunk)
+                while len(text) >= args.chunk_size:
+                    out.write(from_braille(text[:args.chunk_size], args.byteorder, args.encoding, args.errors,
+                        args.layout))
+                    text = text[args.chunk_size:]
+            text += decoder.decode(b'', final = True)
+            if text:
+                out.write(from_braille(text, args.byteorder, args.encoding, args.errors, args.layout))
+    out.flush()
+    return 0
+
+def dump():
+    sys.exit(_run(dump_main, None))
+
+def undump():
+    sys.exit(_run(undump_main, None))
+
+if __name__ == '__main__':
+    dump()
@@ -0,0 +1,132 @@
+# vim: ts=4 number et
+r"""
+    'braille' text encoding, registered with the codecs module when the package is imported
+
+    decoding turns bytes into Braille cells and encoding turns cells back into bytes, so that the whole codecs/io
+    machinery works with Braille:
+
+        >>> b'\x00\xff'.decode('braille')
+        '⠀⣿'
+        >>> '⠀⣿'.encode('braille')
+        b'\x00\xff'
+        >>> open('capture.bin', encoding = 'braille').read(16)     # Braille view of a binary file
+
+    'braille_ascii' shows ascii-printables as-is (as show_ascii does). Both are stateless: any chunking works with
+    the incremental and stream classes.
+
+    errors, when encoding: anything else than a cell (or an ascii-printable with braille_ascii) goes to the error
+    handler, as with any codec: 'strict' (default) raises UnicodeEncodeError, 'ignore' skips it, 'replace',
+    'backslashreplace', … or any handler from codecs.register_error() replace it (cells and ascii characters of a
+    replacement come out as bytes, as do bytes). 'passthrough' is this codec's own: it encodes them as utf-8.
+"""
+import codecs
+import re
+
+from bytes_as_braille import engine
+
+_NOT_CELL = re.compile('[^\u2800-\u28ff]+')
+_NOT_CELL_OR_PRINTABLE = re.compile('[^\x20-\x7e\u2800-\u28ff]+')
+_NOT_CELL_OR_ASCII = re.compile('[^\x00-\x7f\u2800-\u28ff]')
+
+
+def _cells(text):
+    """ cells (and ascii characters, as they are) to bytes """
+    return engine.decode(text, 'big', 'utf-8', 'passthrough')
+
+def _codec_encode(text, errors, show_ascii, name):
+    """ cells (str) to bytes ; runs of anything else go to the `errors` handler """
+    if errors == 'passthrough':
+        return _cells(text)
+    if not show_ascii:
+        if errors == 'ignore':
+            return engine.decode(text, 'big', 'utf-8', 'ignore')
+        try:
+            return engine.decode(text, 'big', 'utf-8', 'strict')    # nothing but cells, the usual case
+        except ValueError:
+            pass
+    invalid = _NOT_CELL_OR_PRINTABLE if show_ascii else _NOT_CELL
+    reason = "not a Braille cell or ascii-printable" if show_ascii else "not a Braille cell"
+    bad = invalid.search(text)
+    if bad is None:
+        return _cells(text)
+
+    parts = []
+    pos = 0
+    while bad is not None:
+        parts.append(_cells(text[pos:bad.start()]))
+        if errors == 'ignore':
+            pos = bad.end()
+        else:
+            exc = UnicodeEncodeError(name, text, bad.start(), bad.end(), reason)
+            if errors == 'strict':
+                raise exc
+            replacement, pos = codecs.lookup_error(errors)(exc)
+            if pos < 0:
+                pos += len(text)
+            if isinstance(replacement, str):
+                if _NOT_CELL_OR_ASCII.search(replacement):
+                    raise exc
+                replacement = _cells(replacement)
+            parts.append(replacement)
+        bad = invalid.search(text, pos)
+    parts.append(_cells(text[pos:]))
+    return b''.join(parts)
+
+def _codec_decode(data, show_ascii):
+    """ bytes (or any bytes-like, read in place) to cells """
+    return engine.encode(data, 'big', show_ascii)
+
+
+class Codec(codecs.Codec):
+    name = 'braille'
+    show_ascii = False
+
+    def encode(self, input, errors = 'strict'):
+        return _codec_encode(input, errors, self.show_ascii, self.name), len(input)
+
+    def decode(self, input, errors = 'strict'):
+        return _codec_decode(input, self.show_ascii), len(input)
+
+class IncrementalEncoder(codecs.IncrementalEncoder):
+    name = 'braille'
+    show_ascii = False
+
+    def encode(self, input, final = False):
+        return _codec_encode(input, self.errors, self.show_ascii, self.name)
+
+class IncrementalDecoder(codecs.IncrementalDecoder):
+    show_ascii = False
+
+    def decode(self, input, final = False):
+        return _codec_decode(input, self.show_ascii)
+
+class StreamWriter(Codec, codecs.StreamWriter):
+    pass
+
+class StreamReader(Codec, codecs.StreamReader):
+    pass
+
+
+def _codec_info(name, show_ascii):
+    classes = { cls.__name__: type(cls.__name__, (cls, ), {'name': name, 'show_ascii': show_ascii})
+        for cls in (Codec, IncrementalEncoder, IncrementalDecoder, StreamWriter, StreamReader) }
+    return codecs.CodecInfo(
+        name = name,
+        encode = classes['Codec']().encode,
+        decode = classes['Codec']().decode,
+        incrementalencoder = classes['IncrementalEncoder'],
+        incrementaldecoder = classes['IncrementalDecoder'],
+        streamwriter = classes['StreamWriter'],
+        streamreader = classes['StreamReader'],
+    )
+
+CODECS = {
+    'braille': _codec_info('braille', False),
+    'braille_ascii': _codec_info('braille_ascii', True),
+}
+
+def search(name):
+    """ codecs search function """
+    return CODECS.get(name.replace('-', '_'))
+
+codecs.register(search)
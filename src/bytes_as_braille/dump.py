@@ -0,0 +1,180 @@
+# vim: ts=4 number et
+"""
+    hexyl-style dump: an offset column, rows of Braille cells in groups and an optional ascii/hex side column
+
+    rows are sized once (from the terminal width unless given) and written a block at a time, so that
+    inputs of any size go through in bounded memory ; a growing file can be followed, only new rows being dumped
+"""
+from codecs import charmap_decode
+from shutil import get_terminal_size
+import sys
+
+from bytes_as_braille import compile_palette
+from bytes_as_braille.engine import BYTEORDERS, HIGH_ASCII, encode, is_printable, tables, translate
+from bytes_as_braille.stream import CHUNK_SIZE, FOLLOW_INTERVAL, follow as follow_file, iter_chunks
+
+SIDES = (None, 'ascii', 'hex')
+OFFSET_WIDTH = 8
+
+_ASCII_SIDE = ''.join( chr(b) if is_printable(b) else '.' for b in range(256) )    # a charmap decoding table
+
+
+def row_columns(width, group = 8, side = 'ascii'):
+    """ number of terminal columns taken by a row of `width` bytes """
+    groups = -(-width // group)
+    columns = OFFSET_WIDTH + 2 + width + groups - 1
+    if side == 'ascii':
+        columns += 2 + width + groups - 1
+    elif side == 'hex':
+        columns += 2 + 3*width + groups - 2
+    return columns
+
+def fit_width(columns = None, group = 8, side = 'ascii'):
+    """ the most bytes per row (a whole number of groups, at least one) that fit in `columns`
+
+        columns defaults to the width of the terminal
+    """
+    if group < 1:
+        raise ValueError("group must be positive")
+    if columns is None:
+        columns = get_terminal_size().columns
+    width = group
+    while row_columns(width + group, group, side) <= columns:
+        width += group
+    return width
+
+def iter_dump(source, width = None, group = 8, side = 'ascii', offset = 0, byteorder = 'big',
+        show_ascii = False,
+        colorblind = False,
+        rainbow = True,
+        colors = None,
+        coalesce = False,
+        layout = 'columns',
+        follow = False,
+        interval = FOLLOW_INTERVAL,
+    ):
+    """ yields the dump of `source` as blocks of complete lines
+
+        arguments:
+            source: a binary file object, an iterable of chunks or a buffer (see stream.iter_chunks())
+            width: bytes per row ; default: as many groups as fit in the terminal
+            group: bytes per group of cells
+            side: None, 'ascii' or 'hex'
+            offset: offset of the first byte (ie. when resuming a dump)
+            follow: source is a binary file object to keep reading as it grows (see stream.follow()) ; bytes are
+                dumped as soon as they are read: a row left incomplete when the file goes idle is dumped as it is,
+                and the next one starts at the offset of the next byte
+            interval: see stream.follow()
+            other arguments: as to_braille() ; with byteorder = 'little', each row is reversed on its own
+    """
+    if byteorder not in BYTEORDERS:
+        raise Exception("InvalidValueForByteOrder")
+    if side not in SIDES:
+        raise Exception("InvalidValueForSide")
+    if group < 1:
+        raise ValueError("group must be positive")
+    if width is None:
+        width = fit_width(group = group, side = side)
+    elif width < 1:
+        raise ValueError("width must be positive")
+
+    palette = None if colorblind else compile_palette(colors, rainbow, show_ascii, layout)
+
+    if follow:
+        chunks = _whole_rows(follow_file(source, max(CHUNK_SIZE // width, 1) * width, interval, idle = True),
+            width)
+    else:
+        chunks = iter_chunks(source, max(CHUNK_SIZE // width, 1) * width, copy = False)
+    for chunk in chunks:
+        lines = []
+        rows = range(0, len(chunk), width)
+        full = len(chunk) // width * width
+        if palette is None and byteorder == 'big' and full and offset + full <= 16**OFFSET_WIDTH:
+            lines.append(_full_rows(chunk[:full], offset, width, group, side, show_ascii, layout))
+            rows = range(full, len(chunk), width)
+
+        for start in rows:
+            row = chunk[start:start+width]
+            groups = [ row[i:i+group] for i in range(0, len(row), group) ]
+            if byteorder == 'little':
+                cells = ' '.join([ encode(g, byteorder, show_ascii, layout) if palette is None
+                    else palette.encode(g, byteorder, coalesce) for g in reversed(groups) ])
+            elif palette is None:
+                cells = ' '.join([ encode(g, byteorder, show_ascii, layout) for g in groups ])
+            else:
+                cells = ' '.join([ palette.encode(g, byteorder, coalesce) for g in groups ])
+
+            line = f"{offset + start:0{OFFSET_WIDTH}x}  {cells}"
+            if side is not None:
+                line += ' ' * (row_columns(width, group, None) - row_columns(len(row), group, None) + 2)
+                if side == 'ascii':
+                    line += ' '.join([ charmap_decode(g, 'strict', _ASCII_SIDE)[0] for g in groups ])
+                else:
+                    line += '  '.join([ g.hex(' ') for g in groups ])
+            lines.append(line + '\n')
+
+        offset += len(chunk)
+        yield ''.join(lines)
+
+def _whole_rows(chunks, width):
+    """ chunks cut down to whole rows, the rest kept for the next ones until an empty chunk (the source is idle)
+        or the end ; only the row dumped then may be incomplete
+    """
+    buf = bytearray()
+    for chunk in chunks:
+        buf += chunk
+        full = len(buf) if not chunk else len(buf) // width * width
+        if full:
+            yield bytes(buf[:full])
+            del buf[:full]
+    if buf:
+        yield bytes(buf)
+
+def _full_rows(chunk, offset, width, group, side, show_ascii, layout):
+    """ uncolored, big-endian lines for a whole number of rows
+
+        all lines have the same layout, so rather than formatting row after row, each column is filled for all
+        rows at once with a strided slice assignment into a UTF-16 buffer
+    """
+    rows = len(chunk) // width
+    line = row_columns(width, group, side) + 1
+    stride = 2 * line
+    units = bytearray(' ', 'utf-16-be') * (rows * line)
+    units[2*line - 1::stride] = b'\n' * rows
+
+    offsets = ''.join([ f"{o:0{OFFSET_WIDTH}x}" for o in range(offset, offset + len(chunk), width) ]).encode('ascii')
+    for d in range(OFFSET_WIDTH):
+        units[2*d + 1::stride] = offsets[d::OFFSET_WIDTH]
+
+    big = tables('big', layout)
+    if show_ascii:
+        cells = translate(chunk, big.low_ascii, HIGH_ASCII).encode('utf-16-be')
+    else:
+        cells = translate(chunk, big.low).encode('utf-16-be')
+    side_start = row_columns(width, group, None) + 2
+    if side == 'ascii':
+        printable = charmap_decode(chunk, 'strict', _ASCII_SIDE)[0].encode('ascii')
+    elif side == 'hex':
+        digits = chunk.hex().encode('ascii')
+
+    for k in range(width):
+        column = OFFSET_WIDTH + 2 + k + k // group
+        units[2*column::stride] = cells[2*k::2*width]
+        units[2*column + 1::stride] = cells[2*k + 1::2*width]
+        if side == 'ascii':
+            units[2*(side_start + k + k // group) + 1::stride] = printable[k::width]
+        elif side == 'hex':
+            column = side_start + 3*k + k // group
+            units[2*column + 1::stride] = digits[2*k::2*width]
+            units[2*column + 3::stride] = digits[2*k + 1::2*width]
+    return units.decode('utf-16-be')
+
+def dump(source, file = None, **kwargs):
+    """ writes iter_dump(source, **kwargs) to `file` (default: sys.stdout), one write per block of lines ; flushed
+        after each one when following
+    """
+    file = file or sys.stdout
+    for block in iter_dump(source, **kwargs):
+        file.write(block)
+        if kwargs.get('follow'):
+            file.flush()
@@ -0,0 +1,450 @@
+# vim: ts=4 number et
+"""
+    line editor behind input() and ainput()
+
+    the typed text (a list of pieces), the bytes it converts to, the cells displayed for them and the decoded text
+    are kept as separate buffers. Keys only change the end of the line: each buffer records from where it changed,
+    and only that end is converted, rendered, decoded and redrawn, with a few cursor movements instead of wiping
+    and reprinting the whole line. Integer literals are followed by an IntegerLiteral, whose bytes are updated
+    in place. Keys can be fed in batches, with a single redraw at the end, and a (bracketed) Paste is inserted
+    at once.
+
+    cursor movements rely on knowing how many columns were written: decoded text is only shown when it is
+    printable (bytes decoding to control characters are shown as cells), and text with wide characters or
+    combining marks, as well as a change of the terminal's width, has the line drawn again from its start.
+"""
+from codecs import getincrementaldecoder
+from functools import lru_cache
+from shutil import get_terminal_size
+import sys
+import unicodedata
+
+from bytes_as_braille import DEFAULT, INTEGER, BRAILLE, compile_palette, color_backend, from_braille, _colored_text
+from bytes_as_braille.literal import IntegerLiteral
+from bytes_as_braille.read_key_async import Paste
+
+PROMPTS = ('>⠝> ', '>⠊> ', '>⠃> ')
+MENU = "input mode: [s]td, [i]nt, [b]raille ; [enter] inserts EOL ; [d] inserts EOF ; [r]esets input ; ctrl+D again raises EOF"
+
+# keys that insert a symbol rather than moving around
+SYMBOLS = {
+    '\x1b[A': '↑',  # up
+    '\x1b[B': '↓',  # down
+    '\x1b[C': '→',  # right
+    '\x1b[D': '←',  # left
+    '\x1b[H': '↤',  # home
+    '\x1b[F': '↦',  # end
+    '\x1b[5~': '↥', # page up
+    '\x1b[6~': '↧', # page down
+}
+
+_SPECIAL = '\n\r\x04\x7f\x08\x03'    # keys feed() does something else with than inserting them
+_DECODE_STEP = 1 << 12  # bytes decoded at once, and between restart points
+_RENDERINGS = 16        # buffers whose rendering is kept
+
+
+@lru_cache(maxsize = 4096)
+def _char_columns(c):
+    """ columns a printable character takes on a terminal: 0 for combining marks, 2 for wide characters """
+    if unicodedata.combining(c) or unicodedata.category(c) in ('Mn', 'Me'):
+        return 0
+    return 2 if unicodedata.east_asian_width(c) in 'WF' else 1
+
+def _narrow(text):
+    """ whether each character of (printable) text takes a single column """
+    return text.isascii() or all(_char_columns(c) == 1 for c in set(text))
+
+def _advance(position, text, width):
+    """ position of the cursor (columns from the start of the prompt line, wrapped lines included) after writing
+        printable text from `position` on a terminal `width` columns wide
+    """
+    for c in text:
+        columns = _char_columns(c)
+        if columns == 2 and position % width == width - 1:
+            position += 1       # a wide character doesn't fit in the last column: it goes to the next line
+        position += columns
+    return position
+
+
+def _common_prefix(a, b):
+    """ length of the common prefix of two strings (compared by slices, not character by character) """
+    low, high = 0, min(len(a), len(b)) + 1    # a[:low] == b[:low] and a[:high] != b[:high]
+    while high - low > 1:
+        mid = (low + high) // 2
+        if a[low:mid] == b[low:mid]:
+            low = mid
+        else:
+            high = mid
+    return low
+
+
+class _Decoding:
+    """ the text a buffer decodes to (from `start`), kept with restart points every few KB so that a change near
+        the end is decoded again from the last point before it
+    """
+    def __init__(self, encoding, start):
+        self.start = start
+        self.decoder = getincrementaldecoder(encoding)()
+        self.marks = [(start, 0, self.decoder.getstate())]    # (index in the buffer, characters before it, state)
+        self.pieces = []        # text between marks
+        self.shapes = []        # (printable, narrow) for each piece
+        self.failed = None      # index of the mark at which decoding failed
+        self.dropped = ''       # text of the pieces the last sync() decoded again
+
+    def sync(self, buffer, changed):
+        """ follows the buffer (changed since `changed`) ; returns how many of the pieces were kept """
+        marks, pieces = self.marks, self.pieces
+        dropped = []
+        while len(marks) > 1 and marks[-1][0] > changed:
+            marks.pop()
+            dropped.append(pieces.pop())
+            self.shapes.pop()
+        self.dropped = ''.join(reversed(dropped))
+        if self.failed is not None and self.failed >= len(marks) - 1:
+            self.failed = None
+        kept = len(pieces)
+        if self.failed is None:
+            position, count, state = marks[-1]
+            self.decoder.setstate(state)
+            while position < len(buffer):
+                chunk = buffer[position:position+_DECODE_STEP]
+                try:
+                    piece = self.decoder.decode(chunk)
+                except UnicodeDecodeError:
+                    self.failed = len(marks) - 1
+                    break
+                position += len(chunk)
+                count += len(piece)
+                pieces.append(piece)
+                self.shapes.append((piece.isprintable(), _narrow(piece)))
+                marks.append((position, count, self.decoder.getstate()))
+        return kept
+
+    @property
+    def valid(self):
+        """ whether the whole buffer decodes, nothing left pending """
+        return self.failed is None and not self.marks[-1][2][0]
+
+    def shape(self):
+        """ (printable, narrow) for the whole text ; text starting with a combining mark isn't printable on its own """
+        first = next(filter(None, self.pieces), ' ')[0]
+        printable = all(printable for printable, narrow in self.shapes) and _char_columns(first) > 0
+        return printable, all(narrow for printable, narrow in self.shapes)
+
+    def text(self, kept = 0):
+        """ the text after the first `kept` pieces, and how many characters those are """
+        return ''.join(self.pieces[kept:]), self.marks[kept][1]
+
+class _Rendering:
+    """ the cells of a buffer that changes at its end, and its decoded text """
+    __slots__ = ('buffer', 'units', 'decoding')
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.units = []         # one cell per byte
+        self.decoding = None
+
+    def sync(self, changed, cells):
+        units = self.units
+        del units[changed:]
+        units += map(cells.__getitem__, self.buffer[len(units):])
+
+
+class LineEditor:
+    """ state of an interactive prompt ; feed() it keys, redraw() and read `result` once `done`
+
+        arguments: as input()
+    """
+    def __init__(self, prompt = None, byteorder = 'big', encoding = 'utf-8', palette = None, mode = DEFAULT,
+            file = None):
+        if type(prompt) is str:
+            prompt = (prompt, ) + PROMPTS[1:]
+        elif prompt is None:
+            prompt = PROMPTS
+        self.prompts = { DEFAULT: prompt[0], INTEGER: prompt[1], BRAILLE: prompt[2], }
+        self.byteorder = byteorder
+        self.encoding = encoding
+        self.mode = mode
+        self.file = sys.stdout if file is None else file
+        self.width = max(get_terminal_size().columns, 1)
+        self.done = False
+        self.result = None
+        self._menu = False
+
+        self._pieces = []               # the typed text, one piece per insertion
+        self._length = 0
+        self._chars = bytearray()       # text converted character by character (when it isn't an integer literal)
+        self._chars_changed = 0         # index of _chars from which it changed since it was last drawn
+        self._literal = IntegerLiteral(byteorder)
+
+        # what is displayed: the prompt, then units (one per column: cells, or characters of decoded text)
+        self._cells = compile_palette(palette, False, True).big
+        self._text_head, _, self._text_reset = _colored_text('\x00', palette).partition('\x00')
+        self._head, _, self._reset = color_backend().fore_text('\x00').partition('\x00')
+        self._renderings = {}           # id(buffer): _Rendering, most recently drawn last
+        try:
+            getincrementaldecoder(encoding)
+            self._decodable = True
+        except (LookupError, TypeError):
+            self._decodable = False
+        self._shown_prompt = ''
+        self._shown = None              # what the units are: (rendering, start, reversed, text)
+        self._count = 0                 # units displayed
+        self._narrow = True             # whether each of them takes a single column
+        self._cursor = 0                # columns from the start of the prompt
+
+    # text → bytes
+
+    def _convert(self, s):
+        """ bytes for characters of the text, one at a time (no integer literal) """
+        if self.mode is DEFAULT:
+            return from_braille(s)
+        return s.encode('utf-8')
+
+    @property
+    def text(self):
+        if len(self._pieces) > 1:
+            self._pieces[:] = [''.join(self._pieces)]
+        return self._pieces[0] if self._pieces else ''
+
+    def _view(self):
+        """ (buffer, start, reversed): the current bytes are buffer[start:], reversed or not """
+        if self.mode is not INTEGER:
+            view = self._literal.view()
+            if view is not None:
+                return *view, self.byteorder == 'little'
+        return self._chars, 0, False
+
+    @property
+    def data(self):
+        """ the bytes the current text stands for """
+        buffer, start, reverse = self._view()
+        data = bytes(buffer[start:])
+        return data[::-1] if reverse else data
+
+    def insert(self, s):
+        """ appends typed or pasted text """
+        self._pieces.append(s)
+        self._length += len(s)
+        self._chars += self._convert(s)
+        self._literal.append(s)
+
+    def delete(self, n = 1):
+        """ removes the last n characters """
+        n = min(n, self._length)
+        if n <= 0:
+            return
+        removed = []
+        left = n
+        while left:
+            piece = self._pieces.pop()
+            if len(piece) > left:
+                self._pieces.append(piece[:-left])
+                piece = piece[-left:]
+            removed.append(piece)
+            left -= len(piece)
+        self._length -= n
+        del self._chars[len(self._chars) - len(self._convert(''.join(reversed(removed)))):]
+        self._chars_changed = min(self._chars_changed, len(self._chars))
+        self._literal.delete(n)
+
+    def reset(self):
+        self._pieces.clear()
+        self._length = 0
+        self._chars.clear()
+        self._chars_changed = 0
+        self._literal.reset()
+
+    def set_mode(self, mode):
+        self.mode = mode
+        self._chars = bytearray(self._convert(self.text))
+        self._chars_changed = 0
+
+    # keys
+
+    def feed(self, key):
+        """ handles one key (or pasted text) ; sets `done` and `result` on [enter] """
+        if isinstance(key, Paste):      # inserted as it is, whatever it contains
+            self._menu = False
+            self.insert(key.replace('\r\n', '\n').replace('\r', '\n'))
+            return
+        if self._menu:
+            self._menu = False
+            match key:
+                case 's':
+                    self.set_mode(DEFAULT)
+                case 'i':
+                    self.set_mode(INTEGER)
+                case 'b':
+                    self.set_mode(BRAILLE)
+                case '\n' | '\r':
+                    self.insert('\n')
+                case 'r':
+                    self.reset()
+                case 'd':
+                    self.insert('\x04')
+                case '\x03':
+                    raise KeyboardInterrupt
+                case '\x04':
+                    raise EOFError
+            return
+
+        match key:
+            case '\n' | '\r':
+                data = self.data
+                self.result = data if len(data) else None
+                self.done = True
+            case '\x04':
+                self._write('\n' + MENU + '\n')
+                self._forget()
+                self._menu = True
+            case '\x7f' | '\x08':   # backspace
+                self.delete()
+            case '\x03':
+                raise KeyboardInterrupt
+            case k if k in SYMBOLS:
+                self.insert(SYMBOLS[k])
+            case k if k:
+                self.insert(k)
+
+    def feed_all(self, keys):
+        """ handles several keys, stopping at [enter] ; runs of plain characters are inserted at once """
+        run = []
+        for key in keys:
+            if len(key) == 1 and key not in _SPECIAL and not self._menu:
+                run.append(key)
+                continue
+            if run:
+                self.insert(''.join(run))
+                run = []
+            self.feed(key)
+            if self.done:
+                return
+        if run:
+            self.insert(''.join(run))
+
+    # display
+
+    def _write(self, s):
+        self.file.write(s)
+        self.file.flush()
+
+    def _forget(self):
+        """ the line is gone from the screen (something else was printed) ; the next redraw starts afresh """
+        self._shown_prompt = ''
+        self._shown = None
+        self._count = 0
+        self._narrow = True
+        self._cursor = 0
+
+    def _rendering(self, buffer):
+        """ the _Rendering kept for buffer (a new one for a new buffer) """
+        rendering = self._renderings.pop(id(buffer), None)
+        if rendering is None or rendering.buffer is not buffer:
+            rendering = _Rendering(buffer)
+            if len(self._renderings) >= _RENDERINGS:
+                del self._renderings[next(iter(self._renderings))]
+        self._renderings[id(buffer)] = rendering
+        return rendering
+
+    def _render(self):
+        """ what to display: (shown, units, keep, tail, narrow) where shown tells what the units are, units is
+            their number, keep how many of those on the screen are still valid, tail the (uncolored) text after
+            them and narrow whether each unit takes one column (if not, keep is 0 unless nothing changed)
+        """
+        buffer, start, reverse = self._view()
+        if buffer is self._chars:
+            changed, self._chars_changed = self._chars_changed, len(buffer)
+        else:
+            changed = self._literal.take_changes()
+        rendering = self._rendering(buffer)
+        rendering.sync(changed, self._cells)
+
+        if self._decodable and not reverse:
+            decoding = rendering.decoding
+            if decoding is None or decoding.start != start:
+                decoding = rendering.decoding = _Decoding(self.encoding, start)
+            kept = decoding.sync(buffer, changed)
+            printable, narrow = decoding.shape() if decoding.valid else (False, False)
+            if printable:               # decoded text, colored as a whole
+                shown = (rendering, start, False, True)
+                if shown != self._shown or not narrow and kept < len(decoding.pieces):
+                    tail, keep = decoding.text()
+                else:                   # what was decoded again may start as it did
+                    tail, keep = decoding.text(kept)
+                    same = _common_prefix(decoding.dropped, tail)
+                    tail, keep = tail[same:], keep + same
+                return shown, decoding.marks[-1][1], keep, tail, narrow
+        elif self._decodable:
+            try:
+                text = bytes(buffer[start:])[::-1].decode(self.encoding)
+            except UnicodeDecodeError:
+                text = None
+            if text is not None and text.isprintable() and _char_columns(text[:1] or ' ') > 0:
+                shown = (rendering, start, True, True)
+                narrow = _narrow(text)
+                keep = len(text) if shown == self._shown and changed >= len(buffer) else 0
+                return shown, len(text), keep, text[keep:], narrow
+
+        units = rendering.units
+        shown = (rendering, start, reverse, False)
+        if shown != self._shown:
+            keep = 0
+        elif reverse:
+            keep = self._count if changed >= len(buffer) else 0
+        else:
+            keep = max(min(changed - start, self._count), 0)
+        if reverse:
+            return shown, len(units) - start, keep, ''.join(reversed(units[start:]))[keep:], True
+        return shown, len(units) - start, keep, ''.join(units[start+keep:]), True
+
+    def _move(self, target):
+        """ escapes moving the cursor back to column `target` of the prompt line (wrapped lines included) """
+        rows = self._cursor // self.width - target // self.width
+        column = target % self.width
+        if rows:
+            return f"\x1b[{rows}A\r" + (f"\x1b[{column}C" if column else '')
+        back = self._cursor % self.width - column
+        return f"\x1b[{back}D" if back else ''
+
+    def redraw(self):
+        """ updates the screen: only what changed since the last redraw is written again, unless the width of the
+            terminal changed or the text has characters that aren't one column wide
+        """
+        prompt = self.prompts[self.mode]
+        width = max(get_terminal_size().columns, 1)
+        if prompt != self._shown_prompt or width != self.width or not self._narrow:
+            out = [self._move(0), '\r\x1b[J', prompt]
+            self._forget()
+            self.width = width
+            shown, units, keep, tail, narrow = self._render()
+        else:
+            shown, units, keep, tail, narrow = self._render()
+            if shown == self._shown and keep == units == self._count:
+                return
+            if narrow:
+                out = [self._move(_advance(0, prompt, width) + keep)]
+            else:
+                out = [self._move(0), '\r\x1b[J', prompt]
+
+        out.append(self._head)
+        if shown[3]:
+            out += (self._text_head, tail, self._text_reset)
+        else:
+            out.append(tail)
+        out.append(self._reset)
+        start = _advance(0, prompt, width)
+        self._cursor = start + units if narrow else _advance(start, tail, width)
+        if self._cursor and self._cursor % width == 0:
+            out.append(' \r')   # leave the pending wrap at the right margin: the cursor goes where it is counted
+        out.append('\x1b[J')
+        self._write(''.join(out))
+        self._shown_prompt = prompt
+        self._shown = shown
+        self._count = units
+        self._narrow = narrow
+
+    def finish(self):
+        """ moves to the next line, after the input """
+        self._write('\n')
+        self._forget()
@@ -0,0 +1,309 @@
+# vim: ts=4 number et
+"""
+    translation tables for to_braille() and from_braille(), built once per byte order and dot layout
+
+    every Braille cell lives in U+2800 … U+28FF, so a cell is fully described by the low byte of its code point ;
+    the tables give the low (and high) byte of each cell's code point, and a bytestring – or any other buffer – is
+    converted by a single charmap decode through them. No Python-level loop per byte, in either direction.
+    encode_utf8() goes on to UTF-8 bytes a block at a time, so that the whole str never exists.
+
+    little-endian reverses the order of the bytes and of the bits in each byte ; the latter is folded into the
+    tables, and costs nothing.
+"""
+
+from codecs import charmap_decode
+from collections import namedtuple
+from functools import lru_cache
+from io import BytesIO
+import re
+
+# ordered, low values first (LSB if bottom-right, MSB is top-left, in columns)
+BYTES_AS_BRAILLE = {
+    0x00: '⠀', 0x01: '⢀', 0x02: '⠠', 0x03: '⢠', 0x04: '⠐', 0x05: '⢐', 0x06: '⠰', 0x07: '⢰', 0x08: '⠈', 0x09: '⢈', 0x0a: '⠨', 0x0b: '⢨', 0x0c: '⠘', 0x0d: '⢘', 0x0e: '⠸', 0x0f: '⢸',
+    0x10: '⡀', 0x11: '⣀', 0x12: '⡠', 0x13: '⣠', 0x14: '⡐', 0x15: '⣐', 0x16: '⡰', 0x17: '⣰', 0x18: '⡈', 0x19: '⣈', 0x1a: '⡨', 0x1b: '⣨', 0x1c: '⡘', 0x1d: '⡸', 0x1e: '⣘', 0x1f: '⣸',
+    0x20: '⠄', 0x21: '⢄', 0x22: '⠤', 0x23: '⢤', 0x24: '⠔', 0x25: '⢔', 0x26: '⠴', 0x27: '⢴', 0x28: '⠌', 0x29: '⢌', 0x2a: '⠬', 0x2b: '⢬', 0x2c: '⠜', 0x2d: '⢜', 0x2e: '⠼', 0x2f: '⢼',
+    0x30: '⡄', 0x31: '⣄', 0x32: '⡤', 0x33: '⣤', 0x34: '⡔', 0x35: '⣔', 0x36: '⡴', 0x37: '⣴', 0x38: '⡌', 0x39: '⣌', 0x3a: '⡬', 0x3b: '⣬', 0x3c: '⡜', 0x3d: '⣜', 0x3e: '⡼', 0x3f: '⣼',
+    0x40: '⠂', 0x41: '⢂', 0x42: '⠢', 0x43: '⢢', 0x44: '⠒', 0x45: '⢒', 0x46: '⠲', 0x47: '⢲', 0x48: '⠊', 0x49: '⢊', 0x4a: '⠪', 0x4b: '⢪', 0x4c: '⠚', 0x4d: '⢚', 0x4e: '⠺', 0x4f: '⢺',
+    0x50: '⡂', 0x51: '⣂', 0x52: '⡢', 0x53: '⣢', 0x54: '⡒', 0x55: '⣒', 0x56: '⡲', 0x57: '⣲', 0x58: '⡊', 0x59: '⣊', 0x5a: '⡪', 0x5b: '⣪', 0x5c: '⡚', 0x5d: '⣚', 0x5e: '⡺', 0x5f: '⣺',
+    0x60: '⠆', 0x61: '⢆', 0x62: '⠦', 0x63: '⢦', 0x64: '⠖', 0x65: '⢖', 0x66: '⠶', 0x67: '⢶', 0x68: '⠎', 0x69: '⢎', 0x6a: '⠮', 0x6b: '⢮', 0x6c: '⠞', 0x6d: '⢞', 0x6e: '⠾', 0x6f: '⢾',
+    0x70: '⡆', 0x71: '⣆', 0x72: '⡦', 0x73: '⣦', 0x74: '⡖', 0x75: '⣖', 0x76: '⡶', 0x77: '⣶', 0x78: '⡎', 0x79: '⣎', 0x7a: '⡮', 0x7b: '⣮', 0x7c: '⡞', 0x7d: '⣞', 0x7e: '⡾', 0x7f: '⣾',
+    0x80: '⠁', 0x81: '⢁', 0x82: '⠡', 0x83: '⢡', 0x84: '⠑', 0x85: '⢑', 0x86: '⠱', 0x87: '⠉', 0x88: '⢉', 0x89: '⠩', 0x8a: '⢩', 0x8b: '⠙', 0x8c: '⢙', 0x8d: '⠹', 0x8e: '⢱', 0x8f: '⢹',
+    0x90: '⡁', 0x91: '⣁', 0x92: '⡡', 0x93: '⣡', 0x94: '⡑', 0x95: '⣑', 0x96: '⡱', 0x97: '⣱', 0x98: '⡉', 0x99: '⣉', 0x9a: '⡩', 0x9b: '⣩', 0x9c: '⡙', 0x9d: '⣙', 0x9e: '⡹', 0x9f: '⣹',
+    0xa0: '⠅', 0xa1: '⢅', 0xa2: '⠥', 0xa3: '⢥', 0xa4: '⠕', 0xa5: '⢕', 0xa6: '⠵', 0xa7: '⢵', 0xa8: '⠍', 0xa9: '⢍', 0xaa: '⠭', 0xab: '⢭', 0xac: '⠝', 0xad: '⢝', 0xae: '⠽', 0xaf: '⢽',
+    0xb0: '⡅', 0xb1: '⣅', 0xb2: '⡥', 0xb3: '⣥', 0xb4: '⡕', 0xb5: '⣕', 0xb6: '⡵', 0xb7: '⣵', 0xb8: '⡍', 0xb9: '⣍', 0xba: '⡭', 0xbb: '⣭', 0xbc: '⡝', 0xbd: '⣝', 0xbe: '⡽', 0xbf: '⣽',
+    0xc0: '⠃', 0xc1: '⢃', 0xc2: '⠣', 0xc3: '⢣', 0xc4: '⠓', 0xc5: '⢓', 0xc6: '⠳', 0xc7: '⢳', 0xc8: '⠋', 0xc9: '⢋', 0xca: '⠫', 0xcb: '⢫', 0xcc: '⠛', 0xcd: '⢛', 0xce: '⠻', 0xcf: '⢻',
+    0xd0: '⡃', 0xd1: '⣃', 0xd2: '⡣', 0xd3: '⣣', 0xd4: '⡓', 0xd5: '⣓', 0xd6: '⡳', 0xd7: '⣳', 0xd8: '⡋', 0xd9: '⣋', 0xda: '⡫', 0xdb: '⣫', 0xdc: '⡛', 0xdd: '⣛', 0xde: '⡻', 0xdf: '⣻',
+    0xe0: '⠇', 0xe1: '⢇', 0xe2: '⠧', 0xe3: '⢧', 0xe4: '⠗', 0xe5: '⢗', 0xe6: '⠷', 0xe7: '⢷', 0xe8: '⠏', 0xe9: '⢏', 0xea: '⠯', 0xeb: '⢯', 0xec: '⠟', 0xed: '⢟', 0xee: '⠿', 0xef: '⢿',
+    0xf0: '⡇', 0xf1: '⣇', 0xf2: '⡧', 0xf3: '⣧', 0xf4: '⡗', 0xf5: '⣗', 0xf6: '⡷', 0xf7: '⣷', 0xf8: '⡏', 0xf9: '⣏', 0xfa: '⡯', 0xfb: '⣯', 0xfc: '⡟', 0xfd: '⣟', 0xfe: '⡿', 0xff: '⣿',
+}
+BRAILLE_AS_BYTES = { cell: bytes((b,)) for b, cell in BYTES_AS_BRAILLE.items() }
+
+BYTEORDERS = ('big', 'little')
+ERRORS = ('strict', 'passthrough', 'ignore')
+BRAILLE_BLOCK = 0x28    # high byte of U+2800 … U+28FF
+UTF8_BLOCK = 1 << 14    # bytes converted at a time by translate_utf8()
+
+# input sizes from which numpy_engine takes over (when numpy is installed) ; None: never. Its decoding of cells
+# mixed with other characters is several times faster, its encoding measured slower than the charmap codec
+NUMPY_ENCODE_THRESHOLD = None
+NUMPY_DECODE_THRESHOLD = 1 << 16
+
+_BRAILLE_RUNS = re.compile('[\u2800-\u28ff]+')
+_NOT_BRAILLE = re.compile('[^\u2800-\u28ff]')
+_NOT_BRAILLE_OR_ASCII = re.compile('[^\x00-\x7f\u2800-\u28ff]')
+_BRAILLE_MASK = bytes( 0xff if high == BRAILLE_BLOCK else 0 for high in range(256) )
+
+def is_printable(b):
+    """ ascii-printable, shown as-is when show_ascii is set """
+    return 32 <= b <= 126
+
+def _dots_layout(dots):
+    """ cells lighting dot dots[0] (numbered as in Unicode, 1 … 8) for the most significant bit, … dots[7] for the
+        least significant one
+    """
+    return { b: chr(BRAILLE_BLOCK << 8 | sum( 1 << (dot - 1) for i, dot in enumerate(dots) if b & 0x80 >> i ))
+        for b in range(256) }
+
+# big-endian cells, by dot layout (see doc/_static/images) ; little-endian is the cell of the byte with its bits
+# reversed, so that the least significant bit takes the place of the most significant one
+LAYOUTS = {
+    'columns': BYTES_AS_BRAILLE,                        # Braille8dotCellNumbering_bigendian.svg: MSB top-left, in columns
+    'dots': _dots_layout((1, 2, 3, 4, 5, 6, 7, 8)),     # Braille8dotCellNumbering.svg: MSB on dot 1, LSB on dot 8
+}
+BIT_REVERSAL = bytes( int(f'{b:08b}'[::-1], 2) for b in range(256) )
+HIGH_ASCII = bytes( 0 if is_printable(b) else BRAILLE_BLOCK for b in range(256) )
+
+Tables = namedtuple('Tables', ('cells', 'low', 'low_ascii', 'reverse'))
+Tables.__doc__ = """ cells: a str of the 256 cells, by byte value ; low: the low byte of their code points, for
+    translate() ; low_ascii: same with show_ascii (ascii-printables are their own low byte, with HIGH_ASCII) ;
+    reverse: low byte of a cell back to the byte value
+"""
+
+@lru_cache(maxsize = None)
+def tables(byteorder = 'big', layout = 'columns'):
+    """ the (cached) Tables for a byte order and a dot layout """
+    if byteorder not in BYTEORDERS:
+        raise Exception("InvalidValueForByteOrder")
+    if layout not in LAYOUTS:
+        raise Exception("InvalidValueForLayout")
+    cells = LAYOUTS[layout]
+    if byteorder == 'little':
+        cells = ''.join( cells[BIT_REVERSAL[b]] for b in range(256) )
+    else:
+        cells = ''.join( cells[b] for b in range(256) )
+    low = bytes( ord(cell) & 0xff for cell in cells )
+    low_ascii = bytes( b if is_printable(b) else l for b, l in enumerate(low) )
+    reverse = bytes( low.index(l) for l in range(256) )
+    return Tables(cells, low, low_ascii, reverse)
+
+# the default layout's tables, by byte order
+TRANSLATE = { order: tables(order).low for order in BYTEORDERS }
+TRANSLATE_ASCII = { order: tables(order).low_ascii for order in BYTEORDERS }
+STR_TRANSLATE = { order: tables(order).cells for order in BYTEORDERS }     # for str.translate(), from latin-1
+REVERSE = { order: tables(order).reverse for order in BYTEORDERS }
+
+def as_buffer(obj):
+    """ bytes and bytearray as they are, anything else exposing the buffer protocol (memoryview, mmap, array,
+        numpy arrays, …) as a flat memoryview of unsigned bytes, without copying ; only buffers that aren't
+        C-contiguous (strided, Fortran-ordered) are copied, in C order. Raises TypeError for anything else.
+    """
+    if isinstance(obj, (bytes, bytearray)):
+        return obj
+    view = memoryview(obj)
+    if not view.c_contiguous:
+        return view.tobytes()
+    if view.format != 'B' or view.ndim != 1:
+        view = view.cast('B')
+    return view
+
+def write_into(out, blocks):
+    """ appends bytes (or an iterable of bytes blocks) to `out` if it is a bytearray, else writes them at the start
+        of the writable buffer `out` ; returns the number of bytes written
+    """
+    if isinstance(blocks, (bytes, bytearray)):
+        blocks = (blocks, )
+    if isinstance(out, bytearray):
+        n = len(out)
+        for block in blocks:
+            out += block
+        return len(out) - n
+    n = 0
+    with memoryview(out) as view, view.cast('B') as view:
+        for block in blocks:
+            if n + len(block) > len(view):
+                raise ValueError(f"out is too small: more than {len(view)} bytes needed")
+            view[n:n+len(block)] = block
+            n += len(block)
+    return n
+
+def join(blocks):
+    """ b''.join(blocks), without holding every block and the result at the same time ; bytes are returned as-is """
+    if isinstance(blocks, bytes):
+        return blocks
+    buf = BytesIO()
+    for block in blocks:
+        buf.write(block)
+    return buf.getvalue()
+
+def _tables(bytestr, byteorder, show_ascii, layout):
+    """ the buffer to translate (reversed for little-endian) and its (low, high) tables """
+    t = tables(byteorder, layout)
+    bytestr = as_buffer(bytestr)
+    if byteorder == 'little':
+        bytestr = _reversed(bytestr)
+
+    if show_ascii:
+        return bytestr, t.low_ascii, HIGH_ASCII
+    else:
+        return bytestr, t.low, None
+
+def _reversed(bytestr):
+    """ a buffer, reversed (and contiguous) """
+    if isinstance(bytestr, (bytes, bytearray)):
+        return bytestr[::-1]
+    return as_buffer(as_buffer(bytestr)[::-1])
+
+def encoder(byteorder = 'big', show_ascii = False, layout = 'columns', utf8 = False):
+    """ encode() (encode_utf8() with utf8) as a function of the bytestring only, its tables resolved once: for
+        many small inputs, at little more than the cost of the translation itself
+    """
+    t = tables(byteorder, layout)
+    table = _charmap(t.low_ascii, HIGH_ASCII) if show_ascii else _charmap(t.low, None)
+    if byteorder == 'little' and utf8:
+        return lambda bytestr: charmap_decode(_reversed(bytestr), 'strict', table)[0].encode('utf-8')
+    elif byteorder == 'little':
+        return lambda bytestr: charmap_decode(_reversed(bytestr), 'strict', table)[0]
+    elif utf8:
+        return lambda bytestr: charmap_decode(bytestr, 'strict', table)[0].encode('utf-8')
+    else:
+        return lambda bytestr: charmap_decode(bytestr, 'strict', table)[0]
+
+def encode(bytestr, byteorder = 'big', show_ascii = False, layout = 'columns'):
+    """ uncolored conversion of a bytestring (or any buffer, see as_buffer()) to Braille cells (ascii-printables
+        as-is with show_ascii), with the dots of a layout from LAYOUTS
+    """
+    return translate(*_tables(bytestr, byteorder, show_ascii, layout))
+
+def encode_utf8(bytestr, byteorder = 'big', show_ascii = False, layout = 'columns'):
+    """ encode(), UTF-8 encoded: bytes, without ever building the whole str """
+    return join(iter_encode_utf8(bytestr, byteorder, show_ascii, layout))
+
+def iter_encode_utf8(bytestr, byteorder = 'big', show_ascii = False, layout = 'columns'):
+    """ encode_utf8() in blocks, as they are converted (see translate_utf8()) """
+    return translate_utf8(*_tables(bytestr, byteorder, show_ascii, layout))
+
+def translate(bytestr, low, high = None):
+    """ one character per byte, its code point given by two bytes.translate() tables (high defaults to U+28xx)
+
+        done by a charmap decoder, which takes any contiguous buffer and builds the str in a single pass
+    """
+    numpy = _numpy_engine(len(bytestr), NUMPY_ENCODE_THRESHOLD)
+    if numpy is not None:
+        return numpy.translate(bytestr, low, high)
+    return charmap_decode(bytestr, 'strict', _charmap(low, high))[0]
+
+def translate_utf8(bytestr, low, high = None):
+    """ translate(), UTF-8 encoded, yielded UTF8_BLOCK bytes of input at a time
+
+        each block goes through a small str that stays in the CPU cache: faster than encoding one large str (or
+        than interleaving 3 bytes.translate() results), for a fraction of its memory
+    """
+    numpy = _numpy_engine(len(bytestr), NUMPY_ENCODE_THRESHOLD)
+    if numpy is not None:
+        yield from numpy.translate_utf8(bytestr, low, high)
+        return
+    table = _charmap(low, high)
+    with memoryview(bytestr) as view:
+        for i in range(0, len(view), UTF8_BLOCK):
+            yield charmap_decode(view[i:i+UTF8_BLOCK], 'strict', table)[0].encode('utf-8')
+
+@lru_cache(maxsize = 64)
+def _charmap(low, high):
+    """ decoding table (a str of 256 characters) for charmap_decode() """
+    if high is None:
+        return ''.join( chr(BRAILLE_BLOCK << 8 | l) for l in low )
+    return ''.join( chr(h << 8 | l) for h, l in zip(high, low) )
+
+def decode(braillestr, byteorder = 'big', encoding = 'utf-8', errors = 'passthrough', layout = 'columns'):
+    """ converts Braille cells (of a layout from LAYOUTS) back to bytes
+
+        errors: what to do with anything that is not a Braille cell
+            'passthrough': encode it with `encoding` (ascii-printables from show_ascii come back as-is)
+            'ignore': skip it
+            'strict': raise ValueError
+    """
+    reverse = tables(byteorder, layout).reverse
+    if errors not in ERRORS:
+        raise Exception("InvalidValueForErrors")
+    if byteorder == 'little':
+        braillestr = braillestr[::-1]
+
+    units = braillestr.encode('utf-16-be', 'surrogatepass')
+    if units[0::2].count(BRAILLE_BLOCK) * 2 == len(units):
+        return units[1::2].translate(reverse)     # nothing but cells, whatever the policy
+
+    if errors == 'strict':
+        bad = _NOT_BRAILLE.search(braillestr)
+        position = bad.start() if byteorder == 'big' else len(braillestr) - 1 - bad.start()
+        raise ValueError(f"not a Braille cell: {bad.group()!r} at position {position}")
+    numpy = _numpy_engine(len(braillestr), NUMPY_DECODE_THRESHOLD)
+    if errors == 'ignore':
+        if numpy is not None:
+            return numpy.cells_only(units, reverse)
+        return _cells_to_bytes(_NOT_BRAILLE.sub('', braillestr), reverse)
+    elif _ascii_compatible(encoding) and numpy is not None:
+        data = numpy.cells_and_ascii(units, reverse)    # None unless there are only cells and ascii characters
+        if data is not None:
+            return data
+    elif _ascii_compatible(encoding) and not _NOT_BRAILLE_OR_ASCII.search(braillestr):
+        # the usual show_ascii output: cells and ascii characters, both one byte each
+        return _cells_and_ascii_to_bytes(braillestr, reverse)
+
+    # whole runs of cells at once, and whatever is in between
+    parts = []
+    pos = 0
+    for run in _BRAILLE_RUNS.finditer(braillestr):
+        start, end = run.span()
+        if start > pos:
+            parts.append(braillestr[pos:start].encode(encoding))
+        parts.append(_cells_to_bytes(run.group(), reverse))
+        pos = end
+    if pos < len(braillestr):
+        parts.append(braillestr[pos:].encode(encoding))
+    return b''.join(parts)
+
+def _cells_to_bytes(cells, reverse):
+    """ Braille cells only: the low byte of each code point, translated back """
+    return cells.encode('utf-16-be')[1::2].translate(reverse)
+
+def _cells_and_ascii_to_bytes(text, reverse):
+    """ Braille cells and ascii characters: translated low bytes where the high byte is the Braille block,
+        the low byte as-is elsewhere ; the selection is done on the whole string at once, as big integers """
+    units = text.encode('utf-16-be')
+    low = units[1::2]
+    mask = int.from_bytes(units[0::2].translate(_BRAILLE_MASK), 'big')
+    cells = int.from_bytes(low.translate(reverse), 'big') & mask
+    ascii = int.from_bytes(low, 'big') & ~mask
+    return (cells | ascii).to_bytes(len(low), 'big')
+
+def _numpy_engine(size, threshold):
+    """ numpy_engine when `size` reaches `threshold` and numpy is installed, else None """
+    if threshold is None or size < threshold:
+        return None
+    return _load_numpy_engine()
+
+@lru_cache(maxsize = None)
+def _load_numpy_engine():
+    try:
+        from bytes_as_braille import numpy_engine
+    except ImportError:
+        return None
+    return numpy_engine
+
+@lru_cache(maxsize = None)
+def _ascii_compatible(encoding):
+    """ whether `encoding` encodes ascii characters as themselves """
+    try:
+        return bytes(range(128)).decode('ascii').encode(encoding) == bytes(range(128))
+    except (LookupError, TypeError):
+        return False
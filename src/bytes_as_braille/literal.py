@@ -0,0 +1,271 @@
+# vim: ts=4 number et
+"""
+    integer literals (as int(text, 0) reads them: 0x…, 0o…, 0b… or decimal, with _ separators) to the minimal bytes
+    of their value
+
+    power-of-two bases are converted in linear time (bytes.fromhex(), or int() which is linear for them) ; decimal
+    numbers are split in halves rather than handed to int() whole (quadratic, and limited to 4300 digits).
+    IntegerLiteral follows a text as characters are typed or removed, updating its bytes rather than parsing again
+"""
+import re
+
+_LITERAL = re.compile(r'''\s*(?P<sign>[+-]?)(?:
+        0[xX](?P<hex>_?[0-9a-fA-F]+(?:_[0-9a-fA-F]+)*)
+      | 0[oO](?P<oct>_?[0-7]+(?:_[0-7]+)*)
+      | 0[bB](?P<bin>_?[01]+(?:_[01]+)*)
+      | (?P<dec>0+(?:_0+)*|[1-9][0-9]*(?:_[0-9]+)*)
+    )\s*''', re.VERBOSE)
+
+_DECIMAL_CHUNK = 512   # digits int() converts at once (well below sys.get_int_max_str_digits())
+
+
+def from_decimal(digits):
+    """ int(digits), by halves for long ones """
+    if len(digits) <= _DECIMAL_CHUNK:
+        return int(digits)
+    half = len(digits) // 2
+    return from_decimal(digits[:half]) * 10**(len(digits) - half) + from_decimal(digits[half:])
+
+def value_bytes(value, byteorder = 'big'):
+    """ the minimal bytes of a non-negative int (b'' for 0) """
+    return value.to_bytes((value.bit_length() + 7) // 8, byteorder)
+
+def _literal_bytes(match, byteorder, decimal):
+    if match['hex']:
+        digits = match['hex'].replace('_', '')
+        b = bytes.fromhex(digits if len(digits) % 2 == 0 else '0' + digits).lstrip(b'\x00')
+        if match['sign'] == '-' and b:
+            return None
+        return b if byteorder == 'big' else b[::-1]
+    if match['dec']:
+        value = decimal(match['dec'].replace('_', ''))
+    else:
+        value = int((match['oct'] or match['bin']).replace('_', ''), 8 if match['oct'] else 2)
+    if match['sign'] == '-' and value:
+        return None
+    return value_bytes(value, byteorder)
+
+def parse_literal(text, byteorder = 'big'):
+    """ the minimal bytes of the integer literal `text`, None if text isn't one (or is negative) """
+    match = _LITERAL.fullmatch(text)
+    return None if match is None else _literal_bytes(match, byteorder, from_decimal)
+
+_BASES = { 'x': 16, 'o': 8, 'b': 2 }
+_BITS = { 16: 4, 8: 3, 2: 1 }
+_DIGIT_RUNS = {
+    10: re.compile('[0-9_]+'),
+    16: re.compile('[0-9a-fA-F_]+'),
+    8: re.compile('[0-7_]+'),
+    2: re.compile('[01_]+'),
+}
+_UNDERSCORE_RUNS = re.compile(b'_+')
+
+
+def _doubled(body):
+    """ number of adjacent '__' pairs in a bytestring """
+    return body.count(b'_') - len(_UNDERSCORE_RUNS.findall(body))
+
+class IntegerLiteral:
+    """ parse_literal() for a text typed at its end: characters are appended and removed with append() and
+        delete(), and view() returns the bytes of the text so far, without parsing it again
+
+        hex, octal and binary digits are kept as bytes for each of the 8 ways their bits can fall on byte
+        boundaries (only 2 for hex): appending or removing digits only touches the last bytes of each, and the
+        value is the one that lines up with the current number of digits. Decimal values are updated from the
+        previous one (a multiplication or a division).
+    """
+    def __init__(self, byteorder = 'big'):
+        self.byteorder = byteorder
+        self.reset()
+
+    def reset(self):
+        self._length = 0        # characters of the text
+        self._invalid = None    # index of the first character that can't be part of a literal
+        self._lead = ''         # whitespace, sign and base prefix
+        self._base = 10
+        self._body = bytearray()    # digits and underscores
+        self._trail = 0         # trailing whitespace characters
+        self._reset_digits()
+
+    def _reset_digits(self):
+        self._digits = bytearray()  # the body without underscores
+        self._doubles = 0       # '__' in the body
+        self._nonzero = 0       # non-zero digits
+        self._zeros = 0         # leading zero digits
+        self._value = 0         # decimal value …
+        self._decimal = None    # … and its bytes, once asked for
+        if self._base == 10:
+            self._aligned = {}
+            self._changed = { None: 0 }
+        else:
+            # aligned[pad]: bytes of pad zero bits followed by the digits' bits, for the complete bytes ; the
+            # remaining bits are in pending[pad] (count, value) ; changed[pad]: see take_changes()
+            bits = _BITS[self._base]
+            pads = { -bits*n % 8 for n in range(8) }
+            self._aligned = { pad: bytearray() for pad in pads }
+            self._pending = { pad: (pad, 0) for pad in pads }
+            self._changed = { pad: 0 for pad in pads }
+
+    # typing
+
+    def append(self, text):
+        """ the text grows by `text` """
+        i = 0
+        while i < len(text) and self._invalid is None:
+            c = text[i]
+            if self._trail:
+                if not c.isspace():
+                    break
+                self._trail += 1
+            elif not self._body and self._base == 10 and c in '+-' and not self._lead.strip():
+                self._lead += c
+            elif not self._body and self._base == 10 and c.isspace() and not self._lead.strip():
+                self._lead += c
+            elif self._body == b'0' and self._base == 10 and c.lower() in _BASES:
+                self._lead += '0' + c   # 0 followed by x, o or b: a base prefix
+                self._body.clear()
+                self._base = _BASES[c.lower()]
+                self._reset_digits()
+            elif (run := _DIGIT_RUNS[self._base].match(text, i)):
+                if not self._body and self._base == 10 and c == '_':
+                    break
+                self._extend(run.group().encode('ascii'))
+                self._length += run.end() - i
+                i = run.end()
+                continue
+            elif c.isspace() and (self._body or self._base != 10):
+                self._trail += 1
+            else:
+                break
+            self._length += 1
+            i += 1
+        if i < len(text):
+            if self._invalid is None:
+                self._invalid = self._length
+            self._length += len(text) - i
+
+    def delete(self, n = 1):
+        """ the last n characters of the text are removed """
+        n = min(n, self._length)
+        if self._invalid is not None:
+            k = min(n, self._length - self._invalid)
+            self._length -= k
+            n -= k
+            if self._length == self._invalid:
+                self._invalid = None
+        while n > 0:
+            if self._trail:
+                k = min(n, self._trail)
+                self._trail -= k
+            elif self._body:
+                k = min(n, len(self._body))
+                self._truncate(len(self._body) - k)
+            elif self._base != 10:     # the x, o or b of the prefix: back to a decimal 0
+                k = 1
+                self._lead = self._lead[:-2]
+                self._base = 10
+                self._reset_digits()
+                self._extend(b'0')
+            else:
+                k = n
+                self._lead = self._lead[:-k]
+            self._length -= k
+            n -= k
+
+    def _extend(self, body):
+        """ appends digits and underscores to the body """
+        self._doubles += _doubled(self._body[-1:] + body)
+        self._body += body
+        digits = body.replace(b'_', b'')
+        if not digits:
+            return
+        if not self._nonzero:
+            self._zeros += len(digits) - len(digits.lstrip(b'0'))
+        self._nonzero += len(digits) - digits.count(b'0')
+        self._digits += digits
+        if self._base == 10:
+            self._value = self._value * 10**len(digits) + from_decimal(digits.decode('ascii'))
+            self._decimal = None
+            self._changed[None] = 0
+            return
+        count = _BITS[self._base] * len(digits)
+        value = int(digits, self._base)
+        for pad, (bits, pending) in self._pending.items():
+            bits += count
+            pending = pending << count | value
+            rest = bits % 8
+            self._aligned[pad] += (pending >> rest).to_bytes(bits // 8, 'big')
+            self._pending[pad] = (rest, pending & ((1 << rest) - 1))
+
+    def _truncate(self, size):
+        """ keeps the first `size` characters of the body """
+        self._doubles -= _doubled(self._body[max(size - 1, 0):])
+        removed = self._body[size:].replace(b'_', b'')
+        del self._body[size:]
+        if not removed:
+            return
+        count = len(self._digits) - len(removed)
+        del self._digits[count:]
+        self._nonzero -= len(removed) - removed.count(b'0')
+        if not self._nonzero:
+            self._zeros = count
+        if self._base == 10:
+            self._value //= 10**len(removed)
+            self._decimal = None
+            self._changed[None] = 0
+            return
+        bits = _BITS[self._base]
+        for pad, aligned in self._aligned.items():
+            total = pad + bits * count
+            rest = total % 8
+            del aligned[total // 8:]
+            self._changed[pad] = min(self._changed[pad], len(aligned))
+            last = self._digits[max(count - -(-rest // bits), 0):]     # the digits the remaining bits are from
+            self._pending[pad] = (rest, int(last or b'0', self._base) & ((1 << rest) - 1))
+
+    # result
+
+    def _valid(self):
+        body = self._body
+        if self._invalid is not None or not self._digits or self._doubles or body.endswith(b'_'):
+            return False
+        if self._base == 10 and body.startswith(b'0') and self._nonzero:
+            return False
+        return not (self._nonzero and '-' in self._lead)
+
+    def _pad(self):
+        return -_BITS[self._base] * len(self._digits) % 8
+
+    def view(self):
+        """ (buffer, start) such that buffer[start:] are the minimal bytes of the value, most significant first ;
+            None if the text is not a literal (or is negative)
+        """
+        if not self._valid():
+            return None
+        if self._base == 10:
+            if self._decimal is None:
+                self._decimal = value_bytes(self._value)
+            return self._decimal, 0
+        pad = self._pad()
+        bits = _BITS[self._base]
+        zero_bits = pad + bits * self._zeros
+        if self._nonzero:   # and those of the first non-zero digit
+            zero_bits += bits - int(self._digits[self._zeros:self._zeros+1], self._base).bit_length()
+        return self._aligned[pad], zero_bits // 8
+
+    def take_changes(self):
+        """ index from which view()'s buffer differs from what it was at the last call ; call it when the text is a
+            literal (view() is not None)
+        """
+        key = None if self._base == 10 else self._pad()
+        changed, self._changed[key] = self._changed[key], len(self.view()[0])
+        return changed
+
+    def to_bytes(self):
+        """ as parse_literal() of the text """
+        view = self.view()
+        if view is None:
+            return None
+        buffer, start = view
+        b = bytes(buffer[start:])
+        return b if self.byteorder == 'big' else b[::-1]
@@ -0,0 +1,65 @@
+# vim: ts=4 number et
+"""
+    vectorized counterparts of engine's translate(), translate_utf8() and of the decoding of cells mixed with other
+    characters, for large inputs ; optional (pip install bytes_as_braille[numpy])
+
+    engine picks these functions above NUMPY_ENCODE_THRESHOLD and NUMPY_DECODE_THRESHOLD when numpy can be
+    imported, and keeps to its own otherwise. Tables are engine's, looked up by fancy indexing.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+from bytes_as_braille.engine import BRAILLE_BLOCK
+
+
+def _array(bytestr):
+    """ any buffer as a flat uint8 array, without copying """
+    return np.frombuffer(bytestr, np.uint8)
+
+@lru_cache(maxsize = 64)
+def _code_points(low, high):
+    """ UTF-16 code unit of each byte's character """
+    low = _array(low).astype(np.uint16)
+    high = np.full(256, BRAILLE_BLOCK, np.uint16) if high is None else _array(high).astype(np.uint16)
+    return (high << 8 | low).astype('<u2')
+
+@lru_cache(maxsize = 64)
+def _utf8(low, high):
+    """ UTF-8 encoding of each byte's character, 3 bytes per row, ascii characters padded with zero bytes """
+    table = np.zeros((256, 3), np.uint8)
+    for b, unit in enumerate(_code_points(low, high).tolist()):
+        encoded = chr(unit).encode('utf-8')
+        table[b, :len(encoded)] = list(encoded)
+    return table
+
+def translate(bytestr, low, high = None):
+    """ engine.translate() """
+    return _code_points(low, high).take(_array(bytestr)).tobytes().decode('utf-16-le')
+
+def translate_utf8(bytestr, low, high = None):
+    """ engine.translate_utf8(), as a single block """
+    encoded = _utf8(low, high).take(_array(bytestr), axis = 0).ravel()
+    if high is not None:    # ascii characters: drop the padding
+        encoded = encoded[encoded != 0]
+    yield encoded.tobytes()
+
+def _units(units):
+    """ high and low bytes of UTF-16-BE code units """
+    units = _array(units)
+    return units[0::2], units[1::2]
+
+def cells_only(units, reverse):
+    """ bytes of the Braille cells among UTF-16-BE code units, anything else skipped """
+    high, low = _units(units)
+    return _array(reverse).take(low[high == BRAILLE_BLOCK]).tobytes()
+
+def cells_and_ascii(units, reverse):
+    """ bytes of UTF-16-BE code units that are Braille cells or ascii characters (these as they are) ; None if
+        there is anything else
+    """
+    high, low = _units(units)
+    cells = high == BRAILLE_BLOCK
+    if not (cells | ((high == 0) & (low < 0x80))).all():
+        return None
+    return np.where(cells, _array(reverse).take(low), low).tobytes()
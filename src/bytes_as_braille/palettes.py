@@ -1,267 +1,184 @@
-PALETTES = {
-    'red_on_grey': {
-            0x00: ('grey', ('bold')),   # usually shows as nothing... no dots!
-            0x01: ('red', ('bold',) ),
-            0x02: ('red', ('bold',) ),
-            0x03: ('red', ('bold',) ),
-            0x04: ('red', ('bold',) ),
-            0x05: ('red', ('bold',) ),
-            0x06: ('red', ('bold',) ),
-            0x07: ('red', ('bold',) ),
-            0x08: ('red', ('bold',) ),
-            0x09: ('red', ('bold',) ),
-            0x0a: ('red', ('bold',) ),
-            0x0b: ('red', ('bold',) ),
-            0x0c: ('red', ('bold',) ),
-            0x0d: ('red', ('bold',) ),
-            0x0e: ('red', ('bold',) ),
-            0x0f: ('red', ('bold',) ),
-            0x10: ('red', ('bold',) ),
-            0x11: ('red', ('bold',) ),
-            0x12: ('red', ('bold',) ),
-            0x13: ('red', ('bold',) ),
-            0x14: ('red', ('bold',) ),
-            0x15: ('red', ('bold',) ),
-            0x16: ('red', ('bold',) ),
-            0x17: ('red', ('bold',) ),
-            0x18: ('red', ('bold',) ),
-            0x19: ('red', ('bold',) ),
-            0x1a: ('red', ('bold',) ),
-            0x1b: ('red', ('bold',) ),
-            0x1c: ('red', ('bold',) ),
-            0x1d: ('red', ('bold',) ),
-            0x1e: ('red', ('bold',) ),
-            0x1f: ('red', ('bold',) ),
-            0x20: ('white', ),
-            0x21: ('white', ),
-            0x22: ('white', ),
-            0x23: ('white', ),
-            0x24: ('white', ),
-            0x25: ('white', ),
-            0x26: ('white', ),
-            0x27: ('white', ),
-            0x28: ('white', ),
-            0x29: ('white', ),
-            0x2a: ('white', ),
-            0x2b: ('white', ),
-            0x2c: ('white', ),
-            0x2d: ('white', ),
-            0x2e: ('white', ),
-            0x2f: ('white', ),
-            0x30: ('white', ),
-            0x31: ('white', ),
-            0x32: ('white', ),
-            0x33: ('white', ),
-            0x34: ('white', ),
-            0x35: ('white', ),
-            0x36: ('white', ),
-            0x37: ('white', ),
-            0x38: ('white', ),
-            0x39: ('white', ),
-            0x3a: ('white', ),
-            0x3b: ('white', ),
-            0x3c: ('white', ),
-            0x3d: ('white', ),
-            0x3e: ('white', ),
-            0x3f: ('white', ),
-            0x40: ('white', ),
-            0x41: ('white', ),
-            0x42: ('white', ),
-            0x43: ('white', ),
-            0x44: ('white', ),
-            0x45: ('white', ),
-            0x46: ('white', ),
-            0x47: ('white', ),
-            0x48: ('white', ),
-            0x49: ('white', ),
-            0x4a: ('white', ),
-            0x4b: ('white', ),
-            0x4c: ('white', ),
-            0x4d: ('white', ),
-            0x4e: ('white', ),
-            0x4f: ('white', ),
-            0x50: ('white', ),
-            0x51: ('white', ),
-            0x52: ('white', ),
-            0x53: ('white', ),
-            0x54: ('white', ),
-            0x55: ('white', ),
-            0x56: ('white', ),
-            0x57: ('white', ),
-            0x58: ('white', ),
-            0x59: ('white', ),
-            0x5a: ('white', ),
-            0x5b: ('white', ),
-            0x5c: ('white', ),
-            0x5d: ('white', ),
-            0x5e: ('white', ),
-            0x5f: ('white', ),
-            0x60: ('white', ),
-            0x61: ('white', ),
-            0x62: ('white', ),
-            0x63: ('white', ),
-            0x64: ('white', ),
-            0x65: ('white', ),
-            0x66: ('white', ),
-            0x67: ('white', ),
-            0x68: ('white', ),
-            0x69: ('white', ),
-            0x6a: ('white', ),
-            0x6b: ('white', ),
-            0x6c: ('white', ),
-            0x6d: ('white', ),
-            0x6e: ('white', ),
-            0x6f: ('white', ),
-            0x70: ('white', ),
-            0x71: ('white', ),
-            0x72: ('white', ),
-            0x73: ('white', ),
-            0x74: ('white', ),
-            0x75: ('white', ),
-            0x76: ('white', ),
-            0x77: ('white', ),
-            0x78: ('white', ),
-            0x79: ('white', ),
-            0x7a: ('white', ),
-            0x7b: ('white', ),
-            0x7c: ('white', ),
-            0x7d: ('white', ),
-            0x7e: ('white', ),
-            0x7f: ('red', ('bold',)),
-            # default color
-            None: ('green', ),
-        },
-    'white_on_grey': {
-            #0x00: ('grey', ('bold')),   # usually shows as nothing... no dots!
-            #0x01: ('red', ('bold',) ),
-            #0x02: ('red', ('bold',) ),
-            #0x03: ('red', ('bold',) ),
-            #0x04: ('red', ('bold',) ),
-            #0x05: ('red', ('bold',) ),
-            #0x06: ('red', ('bold',) ),
-            #0x07: ('red', ('bold',) ),
-            #0x08: ('red', ('bold',) ),
-            #0x09: ('red', ('bold',) ),
-            #0x0a: ('red', ('bold',) ),
-            #0x0b: ('red', ('bold',) ),
-            #0x0c: ('red', ('bold',) ),
-            #0x0d: ('red', ('bold',) ),
-            #0x0e: ('red', ('bold',) ),
-            #0x0f: ('red', ('bold',) ),
-            #0x10: ('red', ('bold',) ),
-            #0x11: ('red', ('bold',) ),
-            #0x12: ('red', ('bold',) ),
-            #0x13: ('red', ('bold',) ),
-            #0x14: ('red', ('bold',) ),
-            #0x15: ('red', ('bold',) ),
-            #0x16: ('red', ('bold',) ),
-            #0x17: ('red', ('bold',) ),
-            #0x18: ('red', ('bold',) ),
-            #0x19: ('red', ('bold',) ),
-            #0x1a: ('red', ('bold',) ),
-            #0x1b: ('red', ('bold',) ),
-            #0x1c: ('red', ('bold',) ),
-            #0x1d: ('red', ('bold',) ),
-            #0x1e: ('red', ('bold',) ),
-            #0x1f: ('red', ('bold',) ),
-            0x20: ('white', ('bold',)),
-            0x21: ('white', ('bold',)),
-            0x22: ('white', ('bold',)),
-            0x23: ('white', ('bold',)),
-            0x24: ('white', ('bold',)),
-            0x25: ('white', ('bold',)),
-            0x26: ('white', ('bold',)),
-            0x27: ('white', ('bold',)),
-            0x28: ('white', ('bold',)),
-            0x29: ('white', ('bold',)),
-            0x2a: ('white', ('bold',)),
-            0x2b: ('white', ('bold',)),
-            0x2c: ('white', ('bold',)),
-            0x2d: ('white', ('bold',)),
-            0x2e: ('white', ('bold',)),
-            0x2f: ('white', ('bold',)),
-            0x30: ('white', ('bold',)),
-            0x31: ('white', ('bold',)),
-            0x32: ('white', ('bold',)),
-            0x33: ('white', ('bold',)),
-            0x34: ('white', ('bold',)),
-            0x35: ('white', ('bold',)),
-            0x36: ('white', ('bold',)),
-            0x37: ('white', ('bold',)),
-            0x38: ('white', ('bold',)),
-            0x39: ('white', ('bold',)),
-            0x3a: ('white', ('bold',)),
-            0x3b: ('white', ('bold',)),
-            0x3c: ('white', ('bold',)),
-            0x3d: ('white', ('bold',)),
-            0x3e: ('white', ('bold',)),
-            0x3f: ('white', ('bold',)),
-            0x40: ('white', ('bold',)),
-            0x41: ('white', ('bold',)),
-            0x42: ('white', ('bold',)),
-            0x43: ('white', ('bold',)),
-            0x44: ('white', ('bold',)),
-            0x45: ('white', ('bold',)),
-            0x46: ('white', ('bold',)),
-            0x47: ('white', ('bold',)),
-            0x48: ('white', ('bold',)),
-            0x49: ('white', ('bold',)),
-            0x4a: ('white', ('bold',)),
-            0x4b: ('white', ('bold',)),
-            0x4c: ('white', ('bold',)),
-            0x4d: ('white', ('bold',)),
-            0x4e: ('white', ('bold',)),
-            0x4f: ('white', ('bold',)),
-            0x50: ('white', ('bold',)),
-            0x51: ('white', ('bold',)),
-            0x52: ('white', ('bold',)),
-            0x53: ('white', ('bold',)),
-            0x54: ('white', ('bold',)),
-            0x55: ('white', ('bold',)),
-            0x56: ('white', ('bold',)),
-            0x57: ('white', ('bold',)),
-            0x58: ('white', ('bold',)),
-            0x59: ('white', ('bold',)),
-            0x5a: ('white', ('bold',)),
-            0x5b: ('white', ('bold',)),
-            0x5c: ('white', ('bold',)),
-            0x5d: ('white', ('bold',)),
-            0x5e: ('white', ('bold',)),
-            0x5f: ('white', ('bold',)),
-            0x60: ('white', ('bold',)),
-            0x61: ('white', ('bold',)),
-            0x62: ('white', ('bold',)),
-            0x63: ('white', ('bold',)),
-            0x64: ('white', ('bold',)),
-            0x65: ('white', ('bold',)),
-            0x66: ('white', ('bold',)),
-            0x67: ('white', ('bold',)),
-            0x68: ('white', ('bold',)),
-            0x69: ('white', ('bold',)),
-            0x6a: ('white', ('bold',)),
-            0x6b: ('white', ('bold',)),
-            0x6c: ('white', ('bold',)),
-            0x6d: ('white', ('bold',)),
-            0x6e: ('white', ('bold',)),
-            0x6f: ('white', ('bold',)),
-            0x70: ('white', ('bold',)),
-            0x71: ('white', ('bold',)),
-            0x72: ('white', ('bold',)),
-            0x73: ('white', ('bold',)),
-            0x74: ('white', ('bold',)),
-            0x75: ('white', ('bold',)),
-            0x76: ('white', ('bold',)),
-            0x77: ('white', ('bold',)),
-            0x78: ('white', ('bold',)),
-            0x79: ('white', ('bold',)),
-            0x7a: ('white', ('bold',)),
-            0x7b: ('white', ('bold',)),
-            0x7c: ('white', ('bold',)),
-            0x7d: ('white', ('bold',)),
-            0x7e: ('white', ('bold',)),
-            #0x7f: ('red', ('bold',)),
-            # default color
-            None: ('white', ('bold',) ),
-        }
+# vim: ts=4 number et
+"""
+    palettes: {byte value: (color, attrs)}, and None for the default color (decoded text)
+
+    they are stored as range rules and only built into Palette objects when first looked up in PALETTES
+"""
+from collections.abc import Mapping, MutableMapping
+from functools import lru_cache
+import os
+
+RED_BOLD = ('red', ('bold', ))
+WHITE = ('white', )
+WHITE_BOLD = ('white', ('bold', ))
+
+RULES = {
+    'red_on_grey': (
+        ((0x00, ), ('grey', ('bold', ))),   # usually shows as nothing... no dots!
+        (range(0x01, 0x20), RED_BOLD),
+        (range(0x20, 0x7f), WHITE),
+        ((0x7f, ), RED_BOLD),
+        # default color
+        (None, ('green', )),
+    ),
+    'white_on_grey': (
+        #((0x00, ), ('grey', ('bold'))),    # usually shows as nothing... no dots!
+        #(range(0x01, 0x06), RED_BOLD),
+        #(range(0x0d, 0x20), RED_BOLD),
+        (range(0x20, 0x7f), WHITE_BOLD),
+        # default color
+        (None, WHITE_BOLD),
+    ),
 }
 
+
+def _style(style):
+    """ validated (color, ) or (color, attrs) style, from a color name, (color, ), (color, attrs) or (color, attr)
+
+        a single attribute is made a tuple: ('grey', ('bold')) is ('grey', 'bold'), for which `'bold' in attrs`
+        used to be a substring check
+    """
+    if isinstance(style, str):
+        style = (style, )
+    try:
+        color, *attrs = style
+    except (TypeError, ValueError):
+        raise ValueError(f"invalid style: {style!r}") from None
+    if not isinstance(color, str) or len(attrs) > 1:
+        raise ValueError(f"invalid style: {style!r}")
+    if not attrs:
+        return (color, )
+    attrs = (attrs[0], ) if isinstance(attrs[0], str) else tuple(attrs[0])
+    if not all( isinstance(attr, str) for attr in attrs ):
+        raise ValueError(f"invalid style: {style!r}")
+    return (color, attrs)
+
+class Palette(Mapping):
+    """ a read-only {byte value: style} mapping (None being the default color, for decoded text)
+
+        rules are (byte values, style) pairs, later ones taking precedence ; byte values are an int, a range or any
+        iterable of ints, or None for the default color. A dict palette works too.
+
+        rules are validated once and stored as 256 bytes of indexes into a small table of styles (index 0: no style)
+    """
+    __slots__ = ('styles', 'indexes', 'default')
+
+    def __init__(self, rules = ()):
+        if isinstance(rules, Mapping):
+            rules = [ (None if b is None else (b, ), style) for b, style in rules.items() ]
+        styles = [None]
+        indexes = bytearray(256)
+        default = None
+        for values, style in rules:
+            style = _style(style)
+            if values is None:
+                default = style
+                continue
+            if style not in styles:
+                styles.append(style)
+            index = styles.index(style)
+            for b in ((values, ) if isinstance(values, int) else values):
+                if not isinstance(b, int) or not 0 <= b <= 0xff:
+                    raise ValueError(f"not a byte value: {b!r}")
+                indexes[b] = index
+        if len(styles) > 256:
+            raise ValueError("more than 255 styles in a palette")
+        self.styles = tuple(styles)
+        self.indexes = bytes(indexes)
+        self.default = default
+
+    def __getitem__(self, b):
+        if b is None:
+            style = self.default
+        elif isinstance(b, int) and 0 <= b <= 0xff:
+            style = self.styles[self.indexes[b]]
+        else:
+            style = None
+        if style is None:
+            raise KeyError(b)
+        return style
+
+    def __iter__(self):
+        yield from ( b for b, index in enumerate(self.indexes) if index )
+        if self.default is not None:
+            yield None
+
+    def __len__(self):
+        return 256 - self.indexes.count(0) + (self.default is not None)
+
+    def __repr__(self):
+        return f"<{type(self).__name__}: {len(self)} entries, {len(self.styles) - 1} styles>"
+
+    def compile(self, rainbow = True, show_ascii = False):
+        """ the (cached) CompiledPalette to_braille() uses for this palette """
+        from bytes_as_braille import compile_palette
+        return compile_palette(self, rainbow, show_ascii)
+
+def _parse_values(key):
+    """ '0x20-0x7e' → range(0x20, 0x7f), '0x7f' → 0x7f, 'default' → None """
+    if key == 'default':
+        return None
+    first, _, last = key.partition('-')
+    try:
+        return range(int(first, 0), int(last or first, 0) + 1)
+    except ValueError:
+        raise ValueError(f"invalid byte values: {key!r}") from None
+
+@lru_cache(maxsize = 32)
+def _load_palette(path, mtime, size):
+    with open(path, 'rb') as f:
+        if path.endswith('.toml'):
+            try:
+                import tomllib
+            except ImportError:     # python < 3.11
+                import tomli as tomllib
+            data = tomllib.load(f)
+        else:
+            import json
+            data = json.load(f)
+    return Palette([ (_parse_values(key), style) for key, style in data.items() ])
+
+def load_palette(path):
+    """ loads a Palette from a .toml (or else JSON) file, cached until the file changes ; ie.
+
+            default = "green"
+            "0x00" = ["grey", ["bold"]]
+            "0x01-0x1f" = ["red", ["bold"]]
+            "0x20-0x7e" = "white"
+    """
+    path = os.path.realpath(path)
+    stat = os.stat(path)
+    return _load_palette(path, stat.st_mtime_ns, stat.st_size)
+
+class LazyPalettes(MutableMapping):
+    """ {name: palette}, building palettes from their rules on first lookup (then always the same Palette) """
+
+    def __init__(self, rules):
+        self._rules = dict(rules)
+        self._palettes = {}
+
+    def __getitem__(self, name):
+        try:
+            return self._palettes[name]
+        except KeyError:
+            palette = self._palettes[name] = Palette(self._rules[name])
+            return palette
+
+    def __setitem__(self, name, palette):
+        self._palettes[name] = palette
+        self._rules[name] = None
+
+    def __delitem__(self, name):
+        del self._rules[name]
+        self._palettes.pop(name, None)
+
+    def __iter__(self):
+        return iter(self._rules)
+
+    def __len__(self):
+        return len(self._rules)
+
+    def __repr__(self):
+        return f"{type(self).__name__}({list(self._rules)})"
+
+PALETTES = LazyPalettes(RULES)
@@ -0,0 +1,116 @@
+# vim: ts=4 number et
+"""
+    encoding large buffers on several cores
+
+    bytes are encoded independently of one another, so a buffer can be cut into chunks that are encoded in
+    parallel and put back in order. Processes are used, unless the interpreter is free-threaded (no GIL), in
+    which case threads do the job without copying chunks around.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+import os
+import sys
+
+from bytes_as_braille import to_braille, compile_palette
+from bytes_as_braille.engine import BYTEORDERS
+
+PARALLEL_CHUNK_SIZE = 1 << 22
+PARALLEL_THRESHOLD = 1 << 24
+
+
+def free_threaded():
+    """ whether this interpreter runs without the GIL """
+    return not getattr(sys, '_is_gil_enabled', lambda: True)()
+
+def _encode_chunk(chunk, **options):
+    return to_braille(chunk, encoding = None, **options)
+
+def _joined(blocks, edges, palette, byteorder):
+    """ coalesced blocks, as if encoded at once: the reset ending a block and the escape sequence opening the next
+        one are dropped where the color goes on (edges: the first and last byte of each block, in output order)
+    """
+    reset = palette.reset
+    pending = None
+    last = ''
+    for block, (first_byte, last_byte) in zip(blocks, edges):
+        first = palette.head(first_byte, byteorder)
+        if pending is not None:
+            yield pending[:-len(reset)] if last and first else pending
+        pending = block[len(first):] if first and first == last else block
+        last = palette.head(last_byte, byteorder)
+    if pending is not None:
+        yield pending
+
+def _iter_encoded(view, starts, chunk_size, encode, workers, threshold, executor):
+    """ encode() of each chunk of view, in order, by a pool of workers when it is worth it """
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if len(view) < threshold or (workers < 2 and executor is None):
+        for start in starts:
+            yield encode(view[start:start+chunk_size])
+        return
+
+    if executor is None:
+        pool = (ThreadPoolExecutor if free_threaded() else ProcessPoolExecutor)(workers)
+    else:
+        pool = executor
+    # threads read the buffer in place, processes need their own copy of each chunk
+    share = isinstance(pool, ThreadPoolExecutor)
+    try:
+        # keep a couple of chunks in flight per worker: enough to keep them busy, not the whole buffer
+        ahead = 2 * workers
+        pending = []
+        for start in starts:
+            chunk = view[start:start+chunk_size]
+            pending.append(pool.submit(encode, chunk if share else chunk.tobytes()))
+            if len(pending) > ahead:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+    finally:
+        if executor is None:
+            pool.shutdown(cancel_futures = True)
+
+def iter_braille_parallel(buffer, workers = None, chunk_size = PARALLEL_CHUNK_SIZE, threshold = PARALLEL_THRESHOLD,
+        executor = None,
+        byteorder = 'big',
+        show_ascii = False,
+        colorblind = False,
+        rainbow = True,
+        colors = None,
+        coalesce = False,
+        layout = 'columns',
+    ):
+    """ yields to_braille(buffer) (no decoding attempted) in chunks, encoded by a pool of workers
+
+        arguments:
+            buffer: anything exposing the buffer protocol (bytes, memoryview, mmap, …)
+            workers: pool size (default: as many as CPUs)
+            chunk_size: bytes per task
+            threshold: below this size (or with a single worker), everything is encoded in the calling thread
+            executor: a concurrent.futures executor to use instead of creating one
+            other arguments: as to_braille()
+
+        with byteorder = 'little', chunks are taken from the end so that the result is the same as to_braille()'s ;
+        with coalesce, color escapes are stitched where chunks meet, also as to_braille() would emit them
+    """
+    if byteorder not in BYTEORDERS:
+        raise Exception("InvalidValueForByteOrder")
+    encode = partial(_encode_chunk, byteorder = byteorder, show_ascii = show_ascii, colorblind = colorblind,
+        rainbow = rainbow, colors = colors, coalesce = coalesce, layout = layout)
+
+    with memoryview(buffer) as view, view.cast('B') as view:
+        starts = range(0, len(view), chunk_size)
+        if byteorder == 'little':
+            starts = starts[::-1]
+
+        blocks = _iter_encoded(view, starts, chunk_size, encode, workers, threshold, executor)
+        if coalesce and not colorblind:
+            edges = ( (view[min(start+chunk_size, len(view))-1], view[start]) if byteorder == 'little'
+                else (view[start], view[min(start+chunk_size, len(view))-1]) for start in starts )
+            blocks = _joined(blocks, edges, compile_palette(colors, rainbow, show_ascii, layout), byteorder)
+        yield from blocks
+
+def to_braille_parallel(buffer, **kwargs):
+    """ same as ''.join(iter_braille_parallel(buffer, **kwargs)) """
+    return ''.join(iter_braille_parallel(buffer, **kwargs))
@@ -0,0 +1,110 @@
+import os
+import select
+import sys
+from collections import deque
+
+from bytes_as_braille.read_key_async import ESC_TIMEOUT, READ_SIZE, KeyParser, raw_mode, restore, termios
+
+class KeyReader:
+	"""
+	Synchronous counterpart of read_key_async.KeyReader: raw mode (and bracketed paste) for the duration of the
+	`with` block, keys parsed from whatever stdin has, pastes coming as a single Paste key.
+
+		with KeyReader() as keys:
+			key = keys.get()
+			more = keys.get_all()	# without waiting
+
+	get() raises EOFError once stdin is exhausted.
+	"""
+	def __init__(self, fd = None, esc_timeout = ESC_TIMEOUT, paste = True):
+		self.fd = sys.stdin.fileno() if fd is None else fd
+		self.esc_timeout = esc_timeout
+		self.paste = paste
+		self._parser = KeyParser()
+		self._keys = deque()
+		self._eof = False
+		self._state = None
+
+	def __enter__(self):
+		self._state = raw_mode(self.fd, self.paste)
+		return self
+
+	def __exit__(self, *exc):
+		restore(self.fd, self._state)
+		self._state = None
+
+	def __iter__(self):
+		try:
+			while True:
+				yield self.get()
+		except EOFError:
+			return
+
+	def _ready(self, timeout):
+		return bool(select.select([self.fd], [], [], timeout)[0])
+
+	def _read(self):
+		data = os.read(self.fd, READ_SIZE)
+		if data:
+			self._keys.extend(self._parser.feed(data))
+		else:
+			self._eof = True
+			self._keys.extend(self._parser.flush())
+
+	def get(self):
+		""" the next key: a character, a whole escape sequence such as '\\x1b[A' or a Paste """
+		while not self._keys:
+			if self._eof:
+				raise EOFError
+			if self._parser.incomplete and not self._ready(self.esc_timeout):
+				self._keys.extend(self._parser.flush())
+			else:
+				self._read()
+		return self._keys.popleft()
+
+	def get_all(self):
+		""" the keys that are already there (maybe none), without waiting """
+		while not self._eof and self._ready(0):
+			self._read()
+		keys = list(self._keys)
+		self._keys.clear()
+		return keys
+
+class ReadcharKeyReader:
+	"""
+	KeyReader for systems without termios (Windows): keys are read with readchar, one at a time ; there is no
+	bracketed paste, a paste comes as the keys it is made of
+
+	get() raises EOFError on ctrl+Z.
+	"""
+	def __init__(self, *args, **kwargs):
+		from readchar import readkey
+		self._readkey = readkey
+		try:
+			from msvcrt import kbhit
+		except ImportError:
+			kbhit = lambda: False
+		self._kbhit = kbhit
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *exc):
+		pass
+
+	def get(self):
+		""" the next key """
+		key = self._readkey()
+		if key == '\x1a':
+			raise EOFError
+		return key
+
+	def get_all(self):
+		""" the keys that are already there (maybe none), without waiting """
+		keys = []
+		while self._kbhit():
+			keys.append(self.get())
+		return keys
+
+if termios is None:
+	KeyReader = ReadcharKeyReader
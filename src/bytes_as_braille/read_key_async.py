@@ -1,46 +1,270 @@
 import asyncio
+import codecs
+import os
 import sys
-import termios
-import tty
-import select
+try:
+	import termios
+	import tty
+except ImportError:	# not a POSIX system: see read_key.ReadcharKeyReader
+	termios = tty = None
+
+ESC_TIMEOUT = 0.05	# seconds to wait for the rest of an escape sequence before taking [esc] as a key
+READ_SIZE = 1 << 16
+
+PASTE_START = '\x1b[200~'
+PASTE_END = '\x1b[201~'
+
+_active = None	# the last KeyReader started (and not closed yet), for read_key()
+
+class Paste(str):
+	"""
+	text pasted in the terminal (bracketed paste), delivered as a single key
+	"""
+	__slots__ = ()
+
+def raw_mode(fd, paste = True):
+	"""
+	puts the terminal in raw mode, keeping output processing (so that print() still works), and turns bracketed
+	paste on ; returns what restore() needs, None if fd is not a terminal
+	"""
+	if not os.isatty(fd):
+		return None
+	settings = termios.tcgetattr(fd)
+	tty.setraw(fd, termios.TCSANOW)
+	mode = termios.tcgetattr(fd)
+	mode[tty.OFLAG] |= termios.OPOST
+	termios.tcsetattr(fd, termios.TCSANOW, mode)
+	if paste and sys.stdout.isatty():
+		sys.stdout.write('\x1b[?2004h')
+		sys.stdout.flush()
+	return settings, paste
+
+def restore(fd, state):
+	"""
+	undoes raw_mode()
+	"""
+	if state is None:
+		return
+	settings, paste = state
+	if paste and sys.stdout.isatty():
+		sys.stdout.write('\x1b[?2004l')
+		sys.stdout.flush()
+	termios.tcsetattr(fd, termios.TCSADRAIN, settings)
+
+class KeyParser:
+	"""
+	splits terminal input into keys, incrementally: characters, whole escape sequences and pastes (Paste) ;
+	bytes are fed as they are read
+
+	`incomplete` tells when the input ends with what may be the start of an escape sequence: the caller waits a
+	little for the rest, then calls flush() to take it as it is (ie. a lone [esc])
+	"""
+	def __init__(self):
+		self._decoder = codecs.getincrementaldecoder('utf-8')('replace')
+		self._pending = ''
+		self._paste = None	# chunks of the paste in progress
+		self.incomplete = False
+
+	def feed(self, data, final = False):
+		""" the keys completed by `data` (bytes) """
+		self._pending += self._decoder.decode(data, final)
+		return self._parse(final)
+
+	def flush(self):
+		""" the keys left, taking an incomplete escape sequence as it is """
+		return self.feed(b'', final = True)
+
+	def _parse(self, final):
+		keys = []
+		pending = self._pending
+		i = 0
+		while i < len(pending):
+			if self._paste is not None:
+				end = pending.find(PASTE_END, i)
+				if end < 0:
+					# keep what could be the beginning of PASTE_END for later
+					cut = len(pending) if final else max(i, len(pending) - len(PASTE_END) + 1)
+					self._paste.append(pending[i:cut])
+					i = cut
+					break
+				self._paste.append(pending[i:end])
+				keys.append(Paste(''.join(self._paste)))
+				self._paste = None
+				i = end + len(PASTE_END)
+				continue
+
+			end = _key_end(pending, i)
+			if end is None:		# incomplete escape sequence
+				if not final:
+					break
+				end = len(pending) if i + 1 < len(pending) and pending[i+1] in '[O' else i + 1
+			key = pending[i:end]
+			if key == PASTE_START:
+				self._paste = []
+			else:
+				keys.append(key)
+			i = end
+		if final and self._paste is not None:	# the end of the paste never came
+			keys.append(Paste(''.join(self._paste)))
+			self._paste = None
+		self._pending = pending[i:]
+		self.incomplete = bool(self._pending) and self._paste is None
+		return keys
+
+class KeyReader:
+	"""
+	Persistent asynchronous key reader.
+
+	The terminal is put in raw mode once (see raw_mode()), stdin is read whenever it becomes readable
+	(loop.add_reader, no thread and no polling) and escape sequences are parsed incrementally ; a lone [esc] is
+	delivered after `esc_timeout`. Keys typed at any time are queued, none are lost between reads. With bracketed
+	paste, pasted text comes as a single Paste key.
+
+		async with KeyReader() as keys:
+			key = await keys.get()
+			async for key in keys:
+				...
+
+	get() raises EOFError once stdin is exhausted.
+	"""
+	def __init__(self, fd = None, esc_timeout = ESC_TIMEOUT, paste = True):
+		self.fd = sys.stdin.fileno() if fd is None else fd
+		self.esc_timeout = esc_timeout
+		self.paste = paste
+		self.queue = asyncio.Queue()
+		self._parser = KeyParser()
+		self._timer = None
+		self._state = None
+		self._loop = None
+		self._previous = None
+
+	def start(self):
+		""" raw mode and reader on ; done by `async with` """
+		self._loop = asyncio.get_running_loop()
+		self._state = raw_mode(self.fd, self.paste)
+		self._loop.add_reader(self.fd, self._on_readable)
+		global _active
+		self._previous, _active = _active, self
+
+	def close(self):
+		""" reader off and terminal restored ; done by `async with` """
+		global _active
+		if self._loop is not None:
+			self._loop.remove_reader(self.fd)
+			self._loop = None
+			if _active is self:
+				_active = self._previous
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
+		restore(self.fd, self._state)
+		self._state = None
+
+	async def __aenter__(self):
+		self.start()
+		return self
+
+	async def __aexit__(self, *exc):
+		self.close()
+
+	def __aiter__(self):
+		return self
+
+	async def __anext__(self):
+		try:
+			return await self.get()
+		except EOFError:
+			raise StopAsyncIteration
+
+	async def get(self):
+		""" the next key: a character, a whole escape sequence such as '\\x1b[A' or a Paste """
+		key = await self.queue.get()
+		if key is None:
+			self.queue.put_nowait(None)	# stays at EOF
+			raise EOFError
+		return key
+
+	def get_all(self):
+		""" the keys already queued (maybe none), without waiting """
+		keys = []
+		while not self.queue.empty():
+			key = self.queue.get_nowait()
+			if key is None:
+				self.queue.put_nowait(None)
+				break
+			keys.append(key)
+		return keys
+
+	def _on_readable(self):
+		try:
+			data = os.read(self.fd, READ_SIZE)
+		except BlockingIOError:
+			return
+		if not data:	# EOF
+			self._loop.remove_reader(self.fd)
+			self._queue(self._parser.flush())
+			self.queue.put_nowait(None)
+			return
+		self._queue(self._parser.feed(data))
+
+	def _on_timeout(self):
+		self._timer = None
+		self._queue(self._parser.flush())
+
+	def _queue(self, keys):
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
+		for key in keys:
+			self.queue.put_nowait(key)
+		if self._parser.incomplete:
+			self._timer = self._loop.call_later(self.esc_timeout, self._on_timeout)
+
+def _key_end(s, i):
+	"""
+	end of the key starting at s[i], None if it may be an escape sequence that isn't complete yet:
+		ESC [ params final (CSI), ESC O x (SS3), ESC x (alt+x) or a single character
+	"""
+	if s[i] != '\x1b':
+		return i + 1
+	if i + 1 == len(s):
+		return None
+	if s[i+1] == '[':
+		for j in range(i + 2, len(s)):
+			if '\x40' <= s[j] <= '\x7e':
+				return j + 1
+			if not '\x20' <= s[j] <= '\x3f':	# not a parameter/intermediate byte: malformed, cut here
+				return j
+		return None
+	if s[i+1] == 'O':
+		return i + 3 if i + 2 < len(s) else None
+	if s[i+1] == '\x1b':
+		return i + 1
+	return i + 2
+
 
 async def read_key():
 	"""
 	Asynchronously read a single keypress.
-	
+
 	NOTE: cannot be replaced by aioinput.ainput
-	TODO: will not work if [esc] is pressed!
+	Uses the running KeyReader (ie. ainput()'s) if any, else one for this key only ; prefer a KeyReader to
+	read several keys.
 	"""
-	def blocking_read_key():
-		fd = sys.stdin.fileno()
-		old_settings = termios.tcgetattr(fd)
-		try:
-			tty.setraw(fd)
-			while True:
-				if select.select([sys.stdin], [], [], 0.1)[0]:	# wait at most 100ms for buffer to contain something
-					char = sys.stdin.read(1)  # Read the first character
-	
-					# Handle special cases and escape sequences
-					if char == '\x1b':  # Start of an escape sequence or standalone Esc
-						next_chars = sys.stdin.read(3)  # Attempt to read up to 3 more characters
-						return char + next_chars
-					else:
-						return char
-		finally:
-			termios.tcsetattr(fd, termios.TCSADRAIN, old_settings)
-
-	return await asyncio.to_thread(blocking_read_key)
+	if _active is not None:
+		return await _active.get()
+	async with KeyReader() as keys:
+		return await keys.get()
 
 # Example usage
 async def main():
 	print("Press any key (Ctrl+C to exit):")
-	try:
-		while True:
-			key = await read_key()
-			print(f"You pressed: {key}")
-	except KeyboardInterrupt:
-		print("\nExiting gracefully.")
+	async with KeyReader() as keys:
+		async for key in keys:
+			if key == '\x03':
+				print("\nExiting gracefully.")
+				break
+			print(f"You pressed: {key!r}")
 
 if __name__ == '__main__':
 	asyncio.run(main())
-
@@ -0,0 +1,152 @@
+# vim: ts=4 number et
+"""
+    reading arbitrarily large inputs in bounded memory, and files as they grow
+"""
+import os
+import select
+import stat
+import time
+
+CHUNK_SIZE = 1 << 16
+FOLLOW_INTERVAL = 1.0   # seconds between checks of a growing file, at most
+
+_POLL_DELAY = 0.01      # first polling delay, doubled up to FOLLOW_INTERVAL while the file stays idle
+_IN_MODIFY = 0x2
+
+
+def iter_chunks(source, chunk_size = CHUNK_SIZE, copy = True):
+    """ yields `chunk_size` bytes at a time (the last chunk may be shorter)
+
+        source can be anything exposing the buffer protocol (bytes, bytearray, mmap, …), a binary file object or
+        an iterable of bytes-like chunks of any size ; buffers are sliced from their start, never copied as a
+        whole (an mmap is read as a buffer, its file position is left alone)
+
+        with copy = False, chunks of a buffer are memoryview slices of it rather than bytes copies: they are only
+        valid until the next chunk is asked for
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    try:
+        view = memoryview(source)
+    except TypeError:
+        pass
+    else:
+        with view, view.cast('B') as view:
+            for i in range(0, len(view), chunk_size):
+                if copy:
+                    yield view[i:i+chunk_size].tobytes()
+                else:
+                    with view[i:i+chunk_size] as chunk:
+                        yield chunk
+        return
+
+    if hasattr(source, 'read'):
+        read = source.read
+        chunks = iter(lambda: read(chunk_size), b'')
+    else:
+        chunks = source
+
+    # file reads may come short (pipes, sockets) and iterables yield whatever they like: re-chunk, full reads
+    # going through as they are
+    buf = bytearray()
+    for chunk in chunks:
+        if not buf and len(chunk) == chunk_size and type(chunk) is bytes:
+            yield chunk
+            continue
+        buf += chunk
+        full = len(buf) // chunk_size * chunk_size
+        if full:
+            with memoryview(buf) as view:
+                blocks = [ view[i:i+chunk_size].tobytes() for i in range(0, full, chunk_size) ]
+            del buf[:full]
+            yield from blocks
+    if buf:
+        yield bytes(buf)
+
+
+def _inotify(fileno):
+    """ a non-blocking inotify descriptor, readable once the file `fileno` is modified ; None if unavailable
+        (not Linux)
+    """
+    try:
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno = True)
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    except (OSError, AttributeError):
+        return None
+    if fd < 0:
+        return None
+    if libc.inotify_add_watch(fd, f"/proc/self/fd/{fileno}".encode(), _IN_MODIFY) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+class _Growth:
+    """ waits for a regular file to be written to: with inotify when possible, otherwise by polling with a delay
+        that grows up to `interval`
+    """
+    def __init__(self, fileno, interval):
+        self.interval = interval
+        self._fd = _inotify(fileno)
+        self._delay = _POLL_DELAY
+
+    def wait(self):
+        if self._fd is None:
+            time.sleep(self._delay)
+            self._delay = min(self._delay * 2, self.interval)
+            return
+        select.select([self._fd], [], [], self.interval)
+        try:
+            os.read(self._fd, 1 << 12)     # drop the events, only their arrival matters
+        except BlockingIOError:
+            pass
+
+    def reset(self):
+        self._delay = _POLL_DELAY
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+def follow(source, chunk_size = CHUNK_SIZE, interval = FOLLOW_INTERVAL, idle = False):
+    """ yields what is read from a binary file object, and then what is appended to it (tail -f) ; never ends
+        for a regular file, ends with the input of a pipe or FIFO
+
+        reads return as soon as some bytes are available (up to chunk_size of them): a backlog goes through in
+        large blocks, new data without delay. An idle file is waited on with inotify where available (Linux),
+        otherwise checked at growing intervals, up to `interval` seconds. A truncated file is read again from
+        its start.
+
+        idle: also yield b'' whenever nothing more can be read right away, before waiting for it (ie. for the
+            caller to output what it holds back)
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+    read = getattr(source, 'read1', source.read)
+    fileno = source.fileno()
+    regular = stat.S_ISREG(os.fstat(fileno).st_mode)
+    growth = None
+    try:
+        while True:
+            chunk = read(chunk_size)
+            if chunk:
+                if growth is not None:
+                    growth.reset()
+                yield chunk
+                if idle and not regular and not select.select([fileno], [], [], 0)[0]:
+                    yield b''       # the next read blocks
+            elif not regular:
+                return
+            elif growth is None:
+                growth = _Growth(fileno, interval)     # and read again: nothing written meanwhile is missed
+            elif os.fstat(fileno).st_size < source.tell():
+                source.seek(0)
+            else:
+                if idle:
+                    yield b''
+                growth.wait()
+    finally:
+        if growth is not None:
+            growth.close()
@@ -0,0 +1,150 @@
+# vim: ts=4 number et
+"""
+    iter_braille() and braille-undump for asyncio streams (sockets, subprocess pipes, …)
+
+    chunks are converted as they arrive, and written to an asyncio.StreamWriter with a drain() after each one: a
+    slow peer holds the producer back instead of output piling up in memory. Converting a large chunk takes
+    milliseconds (more when colored), so chunks of at least `offload` bytes are converted in an executor rather
+    than in the event loop.
+"""
+import asyncio
+from codecs import getincrementaldecoder
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import aclosing
+from functools import partial
+
+from bytes_as_braille import to_braille, from_braille
+from bytes_as_braille.engine import BYTEORDERS
+from bytes_as_braille.stream import CHUNK_SIZE
+
+OFFLOAD_THRESHOLD = 1 << 15
+
+
+async def aiter_chunks(source, chunk_size = CHUNK_SIZE, exact = False):
+    """ yields the bytes of an asyncio.StreamReader (or anything with an async read()) or of an async iterable of
+        bytes-like chunks as they come, at most chunk_size at a time
+
+        exact: chunks of exactly chunk_size bytes (the last one may be shorter), waiting for more data as needed
+    """
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be positive")
+
+    if hasattr(source, 'read'):
+        async def reads():
+            while chunk := await source.read(chunk_size):
+                yield chunk
+        chunks = reads()
+    else:
+        chunks = source
+
+    buf = bytearray()
+    async for chunk in chunks:
+        if not exact:
+            if len(chunk) <= chunk_size:
+                yield chunk
+            else:
+                for i in range(0, len(chunk), chunk_size):
+                    yield chunk[i:i+chunk_size]
+            continue
+        buf += chunk
+        while len(buf) >= chunk_size:
+            yield bytes(buf[:chunk_size])
+            del buf[:chunk_size]
+    if buf:
+        yield bytes(buf)
+
+async def _run(convert, data, executor, offload):
+    """ convert(data), in executor (None: the loop's default one) when data is `offload` long or more """
+    if offload is None or len(data) < offload:
+        return convert(data)
+    if isinstance(executor, ProcessPoolExecutor) and isinstance(data, memoryview):
+        data = data.tobytes()
+    return await asyncio.get_running_loop().run_in_executor(executor, convert, data)
+
+def _encode_chunk(chunk, **options):
+    return to_braille(chunk, encoding = None, **options)
+
+async def aiter_braille(source, chunk_size = CHUNK_SIZE, byteorder = 'big',
+        show_ascii = False,
+        colorblind = False,
+        rainbow = True,
+        colors = None,
+        coalesce = False,
+        as_bytes = False,
+        layout = 'columns',
+        executor = None,
+        offload = OFFLOAD_THRESHOLD,
+    ):
+    """ iter_braille() for an asyncio.StreamReader or an async iterable of bytes ; converts and yields data as it
+        arrives, up to chunk_size bytes at a time
+
+        arguments:
+            executor: where chunks of `offload` bytes or more are converted (None: the event loop's default
+                executor) ; a ProcessPoolExecutor also works
+            offload: None converts everything in the event loop
+            other arguments: as iter_braille()
+
+        with byteorder = 'little', output depends on where chunks are cut: chunks are then exactly chunk_size
+        bytes, and the result is the same as iter_braille()'s (and braille-dump's)
+    """
+    if byteorder not in BYTEORDERS:
+        raise Exception("InvalidValueForByteOrder")
+    encode = partial(_encode_chunk, byteorder = byteorder, show_ascii = show_ascii, colorblind = colorblind,
+        rainbow = rainbow, colors = colors, coalesce = coalesce, as_bytes = as_bytes, layout = layout)
+    async for chunk in aiter_chunks(source, chunk_size, exact = byteorder == 'little'):
+        yield await _run(encode, chunk, executor, offload)
+
+async def aiter_from_braille(source, chunk_size = CHUNK_SIZE, byteorder = 'big', encoding = 'utf-8',
+        errors = 'passthrough',
+        layout = 'columns',
+        executor = None,
+        offload = OFFLOAD_THRESHOLD,
+    ):
+    """ from_braille() for an asyncio.StreamReader or an async iterable of bytes (`encoding` text) ; yields bytes
+        as text arrives, up to chunk_size characters at a time
+
+        arguments: as aiter_braille() and from_braille()
+
+        with byteorder = 'little', text is converted in chunks of exactly chunk_size characters, as
+        braille-undump does, which undoes aiter_braille() with the same chunk_size
+    """
+    if byteorder not in BYTEORDERS:
+        raise Exception("InvalidValueForByteOrder")
+    decode = partial(from_braille, byteorder = byteorder, encoding = encoding, errors = errors, layout = layout)
+    decoder = getincrementaldecoder(encoding)()
+    exact = byteorder == 'little'
+    text = ''
+    async for chunk in aiter_chunks(source, chunk_size):
+        text += decoder.decode(chunk)
+        while text and (len(text) >= chunk_size or not exact):
+            piece, text = text[:chunk_size], text[chunk_size:]
+            yield await _run(decode, piece, executor, offload)
+    text += decoder.decode(b'', final = True)
+    while text:
+        piece, text = text[:chunk_size], text[chunk_size:]
+        yield await _run(decode, piece, executor, offload)
+
+async def _write(blocks, writer):
+    written = 0
+    async with aclosing(blocks):
+        async for block in blocks:
+            if block:
+                writer.write(block)
+                written += len(block)
+                await writer.drain()
+    return written
+
+async def write_braille(source, writer, **options):
+    """ writes aiter_braille(source, **options) UTF-8 encoded to an asyncio.StreamWriter, waiting on drain() after
+        each chunk ; returns the number of bytes written
+
+            reader, writer = await asyncio.open_connection(host, port)
+            await write_braille(reader, log_writer, colorblind = True)
+    """
+    return await _write(aiter_braille(source, as_bytes = True, **options), writer)
+
+async def write_from_braille(source, writer, **options):
+    """ writes aiter_from_braille(source, **options) to an asyncio.StreamWriter, waiting on drain() after each
+        chunk ; returns the number of bytes written
+    """
+    return await _write(aiter_from_braille(source, **options), writer)
@@ -0,0 +1,109 @@
+# vim: ts=4 number et
+"""
+    buffered output of many bytestrings
+
+    BrailleWriter resolves its options once (see braille_encoder()) and gathers converted lines in memory: the
+    target gets one large write per buffer_size characters, instead of a print() - and on a terminal, a flush -
+    per line. With an interval, a timer also writes gathered lines once they are that old, so a slow trickle of
+    records still shows up in time.
+"""
+import io
+import sys
+from threading import Lock, Timer, current_thread
+
+from bytes_as_braille import braille_encoder
+
+BUFFER_SIZE = 1 << 16
+
+
+def _is_binary(file):
+    """ whether `file` takes bytes rather than str """
+    return isinstance(file, (io.RawIOBase, io.BufferedIOBase)) or 'b' in getattr(file, 'mode', '')
+
+class BrailleWriter:
+    """ bprint() for many bytestrings: each is converted with the same options and written as a line, and lines
+        reach the target in large blocks
+
+            with BrailleWriter(f, encoding = None, colorblind = True) as out:
+                for uid in uids:
+                    out.write(uid)
+
+        arguments:
+            file: a text stream, or a binary one (which gets UTF-8) ; default: sys.stdout
+            buffer_size: characters (bytes for a binary file) gathered before they are written
+            interval: seconds after which gathered lines are written and flushed anyway, by a timer thread (ie.
+                0.1 for a terminal) ; None: only by size
+            end: written after each bytestring
+            other arguments: as to_braille()
+
+        flush() (or the end of the `with` block) writes what is left and flushes the target ; the target is not
+        closed. With an interval, the target is written from the timer's thread as well: writes to it that don't go
+        through the BrailleWriter may interleave with those.
+    """
+    def __init__(self, file = None, buffer_size = BUFFER_SIZE, interval = None, end = '\n', **options):
+        self.file = sys.stdout if file is None else file
+        self.buffer_size = buffer_size
+        self.interval = interval
+        binary = _is_binary(self.file)
+        self._encode = braille_encoder(as_bytes = binary, **options)
+        self._end = end.encode('utf-8') if binary else end
+        self._none = b'None' if binary else 'None'
+        self._join = b''.join if binary else ''.join
+        self._parts = []
+        self._size = 0
+        self._lock = Lock()     # parts and the target are shared with the timer
+        self._timer = None      # armed when the first line is gathered, with an interval
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.flush()
+
+    def write(self, bytestr):
+        """ converts bytestr, and gathers it as a line """
+        line = self._encode(bytestr)
+        if line is None:
+            line = self._none
+        self._add(line + self._end)
+
+    def writelines(self, records):
+        """ write() for each bytestring of an iterable """
+        for bytestr in records:
+            self.write(bytestr)
+
+    def _add(self, block):
+        with self._lock:
+            self._parts.append(block)
+            self._size += len(block)
+            if self._size >= self.buffer_size:
+                self._write()
+            elif self._timer is None and self.interval is not None:
+                self._timer = Timer(self.interval, self._expire)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _write(self):
+        """ writes what is gathered (with the lock held) """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._parts:
+            self.file.write(self._join(self._parts))
+            self._parts.clear()
+            self._size = 0
+
+    def _expire(self):
+        """ the timer went off: the oldest gathered line is `interval` old """
+        with self._lock:
+            if self._timer is current_thread():     # not a timer cancelled while it waited for the lock
+                self._write()
+                self.file.flush()
+
+    def flush(self):
+        """ writes what is gathered, and flushes the target """
+        with self._lock:
+            self._write()
+            self.file.flush()
+
+    close = flush
@@ -0,0 +1,50 @@
+# vim: ts=4 number et
+import mmap
+
+import pytest
+
+from bytes_as_braille import dump
+from bytes_as_braille.dump import iter_dump
+
+DATA = bytes(range(256)) * 300
+
+
+@pytest.fixture
+def mapped(tmp_path):
+    path = tmp_path / 'data'
+    path.write_bytes(DATA)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as m:
+        yield m
+
+
+@pytest.mark.parametrize('options', [
+    {},
+    { 'side': 'hex', 'show_ascii': True },
+    { 'side': None, 'byteorder': 'little' },
+    { 'colorblind': False, 'width': 13, 'group': 4 },
+])
+def test_mmap_is_sliced(mapped, monkeypatch, options):
+    options = { 'width': 16, 'colorblind': True, **options }
+    chunks = []
+    original = dump.iter_chunks
+    def iter_chunks(source, chunk_size, copy = True):
+        for chunk in original(source, chunk_size, copy):
+            chunks.append((type(chunk), getattr(chunk, 'obj', None)))
+            yield chunk
+    monkeypatch.setattr(dump, 'iter_chunks', iter_chunks)
+
+    mapped.seek(1000)
+    result = ''.join(iter_dump(mapped, **options))
+    assert chunks and all( kind is memoryview and obj is mapped for kind, obj in chunks )
+    assert mapped.tell() == 1000
+    assert result == ''.join(iter_dump(mapped, **options)) == ''.join(iter_dump(DATA, **options))
+
+def test_rows():
+    assert ''.join(iter_dump(b'hi!', width = 2, group = 1, colorblind = True)) == (
+        '00000000  ⠎ ⢎  h i\n'
+        '00000002  ⢄    !\n')
+
+@pytest.mark.parametrize('options', [{ 'width': 0 }, { 'group': 0 }])
+def test_invalid_sizes(options):
+    with pytest.raises(ValueError):
+        list(iter_dump(DATA, **options))
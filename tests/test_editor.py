@@ -0,0 +1,131 @@
+# vim: ts=4 number et
+import io
+
+import pytest
+
+from bytes_as_braille import DEFAULT, INTEGER, BRAILLE, editor
+from bytes_as_braille.backend import Backend, _plain_text, _plain_bold
+from bytes_as_braille.read_key_async import Paste
+
+
+@pytest.fixture
+def line(monkeypatch):
+    """ a LineEditor with a plain '> ' prompt, writing uncolored output to a StringIO, 8 columns wide """
+    monkeypatch.setattr(editor, 'color_backend', lambda: Backend(None, _plain_text, _plain_bold, None))
+    monkeypatch.setenv('COLUMNS', '8')
+    out = io.StringIO()
+    e = editor.LineEditor(prompt = '> ', palette = None, file = out)
+
+    def type(keys = ''):
+        """ feeds keys, redraws, and returns what was written """
+        e.feed_all(keys)
+        e.redraw()
+        written = out.getvalue()
+        out.seek(0)
+        out.truncate()
+        return written
+    e.type = type
+    return e
+
+
+@pytest.mark.parametrize('text, data', [
+    ('abc', b'abc'),
+    ('⢀⣿', b'\x01\xff'),
+    ('0x41', b'A'),
+    ('255', b'\xff'),
+    ('0b1_0000_0001', b'\x01\x01'),
+    ('0x', b'0x'),
+])
+def test_data(line, text, data):
+    line.type(text)
+    assert line.data == data
+
+def test_data_little_endian():
+    e = editor.LineEditor(byteorder = 'little', palette = None, file = io.StringIO())
+    e.feed_all('0x0102')
+    assert e.data == b'\x02\x01'
+
+def test_modes(line):
+    line.type('0x41')
+    line.set_mode(INTEGER)
+    assert line.data == b'0x41'
+    line.set_mode(BRAILLE)
+    line.delete(4)
+    line.insert('⢀')
+    assert line.data == '⢀'.encode('utf-8')
+    line.set_mode(DEFAULT)
+    assert line.data == b'\x01'
+
+def test_paste_and_delete(line):
+    line.feed(Paste('ab\r\ncd'))
+    assert line.text == 'ab\ncd'
+    line.delete(2)
+    line.delete()
+    assert line.text == 'ab'
+    line.delete(10)
+    assert line.data == b''
+
+def test_enter(line):
+    line.type('0xff\r')
+    assert line.done and line.result == b'\xff'
+
+def test_incremental_redraw(line):
+    assert line.type() == '\r\x1b[J> \x1b[J'
+    assert line.type('a') == 'a\x1b[J'
+    assert line.type('bc') == 'bc\x1b[J'
+    assert line.type('\x7f') == '\x1b[1D\x1b[J'
+    assert line.type() == ''
+
+def test_wrapping(line):
+    line.type()
+    # the cursor is taken to the next line when the text ends at the right margin
+    assert line.type('abcdef') == 'abcdef \r\x1b[J'
+    assert line._cursor == 8
+    assert line.type('\x7f\x7f') == '\x1b[1A\r\x1b[6C\x1b[J'
+    assert line._cursor == 6
+    assert line.type('\x7f' * 4) == '\x1b[4D\x1b[J'
+
+@pytest.mark.parametrize('keys, cell', [
+    ('2', '⠠'),     # \x02
+    ('10', '⠨'),    # \n
+    ('13', '⢘'),    # \r
+])
+def test_control_characters_as_cells(line, keys, cell):
+    line.type()
+    line.type(keys[:-1])
+    written = line.type(keys[-1])
+    assert written.endswith(cell + '\x1b[J')
+    assert line._cursor == 3
+
+def test_literal_digits(line):
+    line.type()
+    assert line.type('2') == '⠠\x1b[J'
+    assert line.type('5') == '\x1b[1D⣈\x1b[J'
+    assert line.type('5') == '\x1b[1D⣿\x1b[J'
+    assert line.type('\x7f\x7f\x7f') == '\x1b[1D\x1b[J'
+
+def test_wide_characters(line):
+    line.type()
+    # columns can't be counted one per character: the line is drawn again from its start
+    assert line.type('中') == '\x1b[2D\r\x1b[J> 中\x1b[J'
+    assert line._cursor == 4
+    assert line.type('a') == '\x1b[4D\r\x1b[J> 中a\x1b[J'
+    assert line.type('\x7f\x7f') == '\x1b[5D\r\x1b[J> \x1b[J'
+
+def test_wide_character_at_the_margin(line):
+    line.type('abcde')
+    line.type('中')
+    # the last column is left empty
+    assert line._cursor == 10
+
+def test_leading_combining_mark(line):
+    line.type()
+    assert line.type('́') == '⠛⢁\x1b[J'
+
+def test_resize(line, monkeypatch):
+    line.type('abcdefg')
+    assert line._cursor == 9
+    monkeypatch.setenv('COLUMNS', '20')
+    # moved up with the old width, then drawn again
+    assert line.type() == '\x1b[1A\r\r\x1b[J> abcdefg\x1b[J'
+    assert line._cursor == 9
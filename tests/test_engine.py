@@ -0,0 +1,23 @@
+# vim: ts=4 number et
+import array
+
+import pytest
+
+from bytes_as_braille import to_braille
+from bytes_as_braille.engine import as_buffer
+
+
+def test_as_buffer():
+    data = b'\x00\x01\xff'
+    assert as_buffer(data) is data
+    view = as_buffer(array.array('H', [0x0102, 0x0304]))
+    assert isinstance(view, memoryview) and view.format == 'B' and len(view) == 4
+
+def test_as_buffer_strided():
+    assert as_buffer(memoryview(b'abcdef')[::2]) == b'ace'
+
+def test_as_buffer_fortran_order():
+    np = pytest.importorskip('numpy')
+    a = np.asfortranarray(np.arange(6, dtype = np.uint8).reshape(2, 3))
+    assert as_buffer(a) == a.tobytes()
+    assert to_braille(a, encoding = None) == to_braille(a.tobytes(), encoding = None)
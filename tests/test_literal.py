@@ -0,0 +1,120 @@
+# vim: ts=4 number et
+import random
+
+import pytest
+
+from bytes_as_braille.literal import IntegerLiteral, parse_literal, value_bytes
+
+BYTEORDERS = ('big', 'little')
+ALPHABET = '0123456789abfxoXOB_ -+'
+PREFIXES = ('', '', '0x', '0X', '0o', '0b', '0B', '-', '+', ' ', '-0x', ' 0o')
+
+
+def reference(text, byteorder):
+    """ what int() makes of text, as bytes """
+    try:
+        value = int(text, 0)
+    except ValueError:
+        return None
+    return None if value < 0 else value_bytes(value, byteorder)
+
+def random_text(rng, length):
+    text = rng.choice(PREFIXES)
+    body = '0123456789abcdef_'
+    return text + ''.join(rng.choice(body if rng.random() < 0.8 else ALPHABET) for _ in range(length))
+
+
+@pytest.mark.parametrize('text', [
+    '0', '00', '0_0', '255', '256', '1_000', '0xff', '0XFF', '0x_f', '0x0001', '0o777', '0o_7', '0b1', '0B_1_0',
+    ' 42 ', '+7', '-0', '-0x0', '-1', '0x', '0b', '0x_', '0x1_', '0x1__2', '_1', '1_', '1__0', '012', '0b2',
+    '0o8', '0xg', '', ' ', '0x 1', '0 x1',
+])
+@pytest.mark.parametrize('byteorder', BYTEORDERS)
+def test_parse_literal(text, byteorder):
+    assert parse_literal(text, byteorder) == reference(text, byteorder)
+
+@pytest.mark.parametrize('seed', range(20))
+def test_parse_literal_random(seed):
+    rng = random.Random(seed)
+    for _ in range(200):
+        text = random_text(rng, rng.randint(0, 40))
+        byteorder = rng.choice(BYTEORDERS)
+        assert parse_literal(text, byteorder) == reference(text, byteorder), text
+
+def test_long_decimal():
+    digits = '9' * 5000
+    assert parse_literal(digits) == value_bytes(10**5000 - 1)
+
+
+def check(literal, text):
+    assert literal.to_bytes() == reference(text, literal.byteorder), text
+    view = literal.view()
+    if view is not None:
+        buffer, start = view
+        data = bytes(buffer[start:])
+        assert (data if literal.byteorder == 'big' else data[::-1]) == literal.to_bytes(), text
+
+@pytest.mark.parametrize('seed', range(20))
+@pytest.mark.parametrize('byteorder', BYTEORDERS)
+def test_every_prefix(seed, byteorder):
+    rng = random.Random(seed)
+    text = random_text(rng, 60)
+    literal = IntegerLiteral(byteorder)
+    for i, c in enumerate(text):
+        literal.append(c)
+        check(literal, text[:i+1])
+
+@pytest.mark.parametrize('seed', range(10))
+def test_every_decimal_prefix(seed):
+    rng = random.Random(seed)
+    text = rng.choice(['', ' ', '+', '-']) + ''.join(rng.choice('0123456789_') for _ in range(80))
+    literal = IntegerLiteral(rng.choice(BYTEORDERS))
+    for i, c in enumerate(text):
+        literal.append(c)
+        check(literal, text[:i+1])
+
+@pytest.mark.parametrize('text', ['0x1_2__3_4', '0b_1_0', '1_2_', '0o__7', '0x_', '__1'])
+def test_underscores(text):
+    literal = IntegerLiteral()
+    for i, c in enumerate(text):
+        literal.append(c)
+        check(literal, text[:i+1])
+    for i in range(len(text), 0, -1):
+        check(literal, text[:i])
+        literal.delete()
+    check(literal, '')
+
+@pytest.mark.parametrize('seed', range(40))
+def test_append_and_delete(seed):
+    rng = random.Random(seed)
+    literal = IntegerLiteral(rng.choice(BYTEORDERS))
+    text = ''
+    for _ in range(100):
+        if text and rng.random() < 0.35:
+            n = rng.randint(1, min(len(text), 5))
+            literal.delete(n)
+            text = text[:-n]
+        else:
+            added = random_text(rng, rng.randint(0, 6)) if not text else \
+                ''.join(rng.choice('0123456789abcdef_' if rng.random() < 0.9 else ALPHABET)
+                    for _ in range(rng.randint(1, 6)))
+            literal.append(added)
+            text += added
+        check(literal, text)
+
+def test_changes():
+    literal = IntegerLiteral()
+    literal.append('0x1234')
+    literal.take_changes()
+    literal.delete(2)
+    literal.append('ff')
+    assert literal.to_bytes() == b'\x12\xff'
+    buffer, start = literal.view()
+    assert literal.take_changes() <= len(buffer) - 1
+
+def test_reset():
+    literal = IntegerLiteral()
+    literal.append('0x12')
+    literal.reset()
+    literal.append('7')
+    check(literal, '7')
@@ -0,0 +1,53 @@
+# vim: ts=4 number et
+import io
+import mmap
+
+import pytest
+
+from bytes_as_braille.stream import iter_chunks
+
+DATA = bytes(range(256)) * 10
+
+
+@pytest.fixture
+def mapped(tmp_path):
+    path = tmp_path / 'data'
+    path.write_bytes(DATA)
+    with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access = mmap.ACCESS_READ) as m:
+        yield m
+
+def expected(size):
+    return [ DATA[i:i+size] for i in range(0, len(DATA), size) ]
+
+
+@pytest.mark.parametrize('size', [1, 7, 256, 1000, 4096])
+def test_sources(size):
+    assert list(iter_chunks(DATA, size)) == expected(size)
+    assert list(iter_chunks(bytearray(DATA), size)) == expected(size)
+    assert list(iter_chunks(io.BytesIO(DATA), size)) == expected(size)
+    pieces = [ DATA[i:i+size+3] for i in range(0, len(DATA), size + 3) ]
+    assert list(iter_chunks(pieces, size)) == expected(size)
+
+def test_full_reads_are_not_copied():
+    chunk = DATA[:100]
+    assert next(iter_chunks([chunk], 100)) is chunk
+
+def test_mmap_is_a_buffer(mapped):
+    mapped.seek(100)
+    assert list(iter_chunks(mapped, 1000)) == expected(1000)
+    assert mapped.tell() == 100
+    # read again: the position isn't consumed
+    assert list(iter_chunks(mapped, 1000)) == expected(1000)
+
+def test_mmap_slices(mapped):
+    chunks = iter_chunks(mapped, 1000, copy = False)
+    chunk = next(chunks)
+    assert isinstance(chunk, memoryview)
+    assert chunk.obj is mapped
+    assert chunk == DATA[:1000]
+    del chunk
+    chunks.close()
+
+def test_chunk_size():
+    with pytest.raises(ValueError):
+        list(iter_chunks(DATA, 0))